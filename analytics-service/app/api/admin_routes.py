@@ -0,0 +1,134 @@
+import hmac
+import os
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+import structlog
+from sqlalchemy.orm import Session
+from app.api.dependencies import get_db
+from app.database.connection import db_manager
+from app.services.archive_service import ParquetArchiver
+from app.services.profiling import profiler
+from app.services.rebuild_service import rebuilder
+
+logger = structlog.get_logger(__name__)
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Guard admin endpoints with ANALYTICS_ADMIN_TOKEN (disabled when it is not set)"""
+    expected = os.getenv('ANALYTICS_ADMIN_TOKEN')
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ANALYTICS_ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+router = APIRouter(
+    prefix="/api/analytics/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)]
+)
+
+@router.post("/profile")
+def start_profiling(
+    seconds: Optional[float] = Query(10, gt=0, le=300, description="Stop after this many seconds"),
+    messages: Optional[int] = Query(None, ge=1, le=100000, description="Stop after this many consumed messages"),
+    interval_ms: float = Query(5, ge=1, le=1000, description="Sampling interval in milliseconds")
+):
+    """Start a sampling profiler session across the API and the consumer thread"""
+    started = profiler.start(
+        db_manager.engines,
+        seconds=seconds,
+        messages=messages,
+        interval=interval_ms / 1000
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    return {
+        "success": True,
+        "data": profiler.session.to_dict(include_folded=False),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+@router.get("/profile")
+def get_profile(
+    format: str = Query("json", pattern="^(json|folded)$", description="json, or folded stacks for flamegraph tools")
+):
+    """Get the running or most recent profiling session"""
+    session = profiler.session
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session has been run")
+
+    if format == "folded":
+        return PlainTextResponse(session.folded())
+
+    return {
+        "success": True,
+        "data": session.to_dict(),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+@router.delete("/profile")
+def stop_profiling():
+    """Stop the running profiling session early"""
+    session = profiler.stop()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session has been run")
+
+    return {
+        "success": True,
+        "data": session.to_dict(include_folded=False),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+@router.post("/archive")
+def run_archive(
+    max_days: Optional[int] = Query(None, ge=1, le=366, description="Archive at most this many days"),
+    db: Session = Depends(get_db)
+):
+    """Export closed days of registration events to the Parquet archive now"""
+    try:
+        summary = ParquetArchiver(db).run(max_days=max_days)
+        
+        return {
+            "success": True,
+            "data": summary,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    except Exception as e:
+        logger.error("Failed to archive events", error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to archive events")
+
+@router.post("/rebuild", status_code=202)
+def start_rebuild(
+    workers: Optional[int] = Query(None, ge=1, le=32, description="Worker processes"),
+    chunk_hours: Optional[int] = Query(None, ge=1, le=24 * 31, description="Hours of events per task"),
+    dry_run: bool = Query(False, description="Report drift without replacing the aggregates")
+):
+    """Rebuild domain, hourly and daily analytics from raw events in the background"""
+    started = rebuilder.start(
+        db_manager.get_ingest_session,
+        workers=workers,
+        chunk_hours=chunk_hours,
+        dry_run=dry_run
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="A rebuild is already running")
+
+    return {
+        "success": True,
+        "data": rebuilder.status,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+@router.get("/rebuild")
+def get_rebuild_status():
+    """Get progress of the running or most recent rebuild"""
+    if rebuilder.status is None:
+        raise HTTPException(status_code=404, detail="No rebuild has been run")
+
+    return {
+        "success": True,
+        "data": rebuilder.status,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import json
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 import structlog
-from app.database.connection import get_db
+from app.api.dependencies import get_db
 from app.services.analytics_service import AnalyticsService
+from app.services.deposit_analytics_service import DepositAnalyticsService
+from app.services.history_service import HistoryQueryService, default_range
+from app.services.live_updates import live_updates
+from app.services.watermark_service import WatermarkService, lag_histogram
 from app.models.analytics import UserRegistrationEvent, DomainAnalytics
 
 logger = structlog.get_logger(__name__)
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
+# Live stream tuning: minimum delay between pushes and idle heartbeat interval
+STREAM_COALESCE_SECONDS = float(os.getenv('ANALYTICS_STREAM_COALESCE_SECONDS', 1.0))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('ANALYTICS_STREAM_HEARTBEAT_SECONDS', 15.0))
+
 @router.get("/health")
 def health_check():
     """Health check endpoint"""
@@ -37,6 +49,46 @@ def get_dashboard_stats(db: Session = Depends(get_db)):
         logger.error("Failed to get dashboard stats", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to retrieve dashboard statistics")
 
+@router.get("/stream")
+async def stream_analytics_updates(request: Request):
+    """Server-Sent Events stream of live analytics deltas"""
+    subscriber = live_updates.subscribe()
+    if subscriber is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many live stream subscribers",
+            headers={"Retry-After": "5"}
+        )
+    
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.event.wait(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                
+                # Let bursts accumulate into a single push
+                await asyncio.sleep(STREAM_COALESCE_SECONDS)
+                update = live_updates.take(subscriber)
+                if update is None:
+                    continue
+                
+                update["timestamp"] = datetime.now(timezone.utc).isoformat()
+                yield f"event: analytics\ndata: {json.dumps(update)}\n\n"
+        finally:
+            live_updates.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/trends/hourly")
 def get_hourly_trends(
     days: int = Query(7, ge=1, le=30, description="Number of days to look back"),
@@ -57,6 +109,95 @@ def get_hourly_trends(
         logger.error("Failed to get hourly trends", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to retrieve hourly trends")
 
+@router.get("/watermarks")
+def get_watermarks(
+    open_limit: int = Query(48, ge=1, le=1000, description="Maximum number of open buckets to list"),
+    db: Session = Depends(get_db)
+):
+    """Get event-time watermarks, open buckets and the end-to-end lag histogram"""
+    try:
+        status = WatermarkService(db).get_status(open_limit=open_limit)
+        status["lag"] = lag_histogram.snapshot()
+        
+        return {
+            "success": True,
+            "data": status,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    except Exception as e:
+        logger.error("Failed to get watermarks", error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve watermarks")
+
+@router.get("/deposits/hourly")
+def get_hourly_deposits(
+    days: int = Query(7, ge=1, le=30, description="Number of days to look back"),
+    db: Session = Depends(get_db)
+):
+    """Get hourly wallet deposit counts and volume"""
+    try:
+        deposit_service = DepositAnalyticsService(db)
+        
+        return {
+            "success": True,
+            "data": deposit_service.get_hourly_deposits(days=days),
+            "summary": deposit_service.get_deposit_summary(),
+            "period_days": days,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    except Exception as e:
+        logger.error("Failed to get hourly deposits", error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve hourly deposits")
+
+def _history_range(start: Optional[date], end: Optional[date]) -> tuple:
+    default_start, default_end = default_range(365)
+    start, end = start or default_start, end or default_end
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    return start, end
+
+@router.get("/history/domains")
+def get_history_domain_mix(
+    start: Optional[date] = Query(None, description="First day (default: 365 days ago)"),
+    end: Optional[date] = Query(None, description="Last day, inclusive (default: yesterday)"),
+    limit: int = Query(10, ge=1, le=100, description="Number of domains to return")
+):
+    """Get domain mix over a long range from the Parquet archive"""
+    start, end = _history_range(start, end)
+    try:
+        history_service = HistoryQueryService()
+        
+        return {
+            "success": True,
+            "data": history_service.get_domain_mix(start, end, limit=limit),
+            "range": {"start": start.isoformat(), "end": end.isoformat()},
+            "archive": history_service.archived_range(),
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    except Exception as e:
+        logger.error("Failed to get historical domain mix", error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve historical domain mix")
+
+@router.get("/history/daily")
+def get_history_daily_registrations(
+    start: Optional[date] = Query(None, description="First day (default: 365 days ago)"),
+    end: Optional[date] = Query(None, description="Last day, inclusive (default: yesterday)")
+):
+    """Get daily registrations over a long range from the Parquet archive"""
+    start, end = _history_range(start, end)
+    try:
+        history_service = HistoryQueryService()
+        
+        return {
+            "success": True,
+            "data": history_service.get_daily_registrations(start, end),
+            "range": {"start": start.isoformat(), "end": end.isoformat()},
+            "archive": history_service.archived_range(),
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    except Exception as e:
+        logger.error("Failed to get historical daily registrations", error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve historical daily registrations")
+
 @router.get("/domains")
 def get_domain_analytics(
     limit: int = Query(10, ge=1, le=100, description="Number of domains to return"),
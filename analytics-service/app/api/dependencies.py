@@ -0,0 +1,40 @@
+import os
+from fastapi import HTTPException
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+import structlog
+from app.database.connection import db_manager
+
+logger = structlog.get_logger(__name__)
+
+# Retry-After sent with 503s when the query pool is exhausted
+QUERY_RETRY_AFTER_SECONDS = int(os.getenv('ANALYTICS_QUERY_RETRY_AFTER_SECONDS', 2))
+
+# Requests shed since startup (reported by /health)
+admission = {"shed_requests": 0}
+
+def get_db() -> Session:
+    """Query-pool session for API routes, with admission control.
+
+    The connection is checked out up front: when the query pool stays
+    exhausted for its timeout the request is shed with 503 + Retry-After
+    instead of failing (or hanging) halfway through the route.
+    """
+    db = db_manager.get_session()
+    try:
+        db.connection()
+    except PoolTimeoutError:
+        db.close()
+        admission["shed_requests"] += 1
+        logger.warning("🚦 Query pool exhausted, shedding request",
+                       shed_requests=admission["shed_requests"], retry_after=QUERY_RETRY_AFTER_SECONDS)
+        raise HTTPException(
+            status_code=503,
+            detail="Database busy, retry later",
+            headers={"Retry-After": str(QUERY_RETRY_AFTER_SECONDS)}
+        )
+
+    try:
+        yield db
+    finally:
+        db.close()
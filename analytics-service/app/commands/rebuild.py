@@ -0,0 +1,36 @@
+"""Rebuild domain, hourly and daily analytics from the raw registration events.
+
+Safe to run while the service is ingesting: events are aggregated in parallel
+into staging tables without locks, and those are renamed into place in one
+short transaction.
+
+    python -m app.commands.rebuild --workers 4 --chunk-hours 24
+    python -m app.commands.rebuild --dry-run   # report drift only
+"""
+import argparse
+import json
+import sys
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (ANALYTICS_REBUILD_WORKERS)")
+    parser.add_argument("--chunk-hours", type=int, default=None,
+                        help="Hours of events per task (ANALYTICS_REBUILD_CHUNK_HOURS)")
+    parser.add_argument("--dry-run", action="store_true", help="Compute and report drift without swapping")
+    args = parser.parse_args(argv)
+
+    from app.database.connection import db_manager
+    from app.services.rebuild_service import rebuilder
+
+    db = db_manager.get_ingest_session()
+    try:
+        status = rebuilder.run(db, workers=args.workers, chunk_hours=args.chunk_hours, dry_run=args.dry_run)
+    finally:
+        db.close()
+        db_manager.close()
+
+    print(json.dumps(status, indent=2))
+    return 0 if status["state"] == "completed" else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,8 @@
 import os
-from sqlalchemy import create_engine
+import threading
+from typing import Dict, List
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
 import structlog
@@ -8,83 +11,196 @@ from app.models.analytics import Base
 # Configure structured logging
 logger = structlog.get_logger(__name__)
 
+# Alembic configuration lives next to the `app` package
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'alembic.ini')
+
+# Revision matching the schema that used to be created by `Base.metadata.create_all`
+INITIAL_REVISION = '0001_initial'
+
+# Ingest (consumer, rebuilds) and query (API reads) use separate pools so a
+# dashboard spike cannot starve ingestion and a backfill cannot starve the API.
+# The ingest pool is sized to its real concurrency: the single consumer thread
+# plus a rebuild. Query checkouts time out quickly so the API can shed load.
+POOL_SETTINGS = {
+    name: {
+        "pool_size": int(os.getenv(f'ANALYTICS_{name.upper()}_POOL_SIZE', size)),
+        "max_overflow": int(os.getenv(f'ANALYTICS_{name.upper()}_POOL_MAX_OVERFLOW', overflow)),
+        "pool_timeout": float(os.getenv(f'ANALYTICS_{name.upper()}_POOL_TIMEOUT', timeout)),
+    }
+    for name, size, overflow, timeout in (
+        ("ingest", 2, 1, 30),
+        ("query", 10, 10, 2),
+    )
+}
+
 class DatabaseManager:
+    """Lazily created engines and session factories, one per connection pool.
+
+    Nothing connects at import time: the engines are built on first use and the
+    schema is only touched by an explicit `run_migrations()` / `create_tables()`.
+    `engine` / `get_session()` are the query pool; the consumer uses
+    `ingest_engine` / `get_ingest_session()`.
+    """
     def __init__(self):
-        self.engine = None
-        self.SessionLocal = None
-        self._initialize_database()
-    
+        self._engines: Dict[str, Engine] = {}
+        self._session_factories: Dict[str, sessionmaker] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> Engine:
+        """Query pool engine, created on first access"""
+        return self._get_engine("query")
+
+    @property
+    def ingest_engine(self) -> Engine:
+        """Ingest pool engine, created on first access"""
+        return self._get_engine("ingest")
+
+    @property
+    def engines(self) -> List[Engine]:
+        """Every engine (for instrumentation such as the profiler)"""
+        return [self._get_engine(name) for name in POOL_SETTINGS]
+
+    @property
+    def SessionLocal(self):
+        """Query pool session factory, created on first access"""
+        if "query" not in self._session_factories:
+            self._initialize_database()
+        return self._session_factories["query"]
+
+    @property
+    def is_initialized(self) -> bool:
+        return bool(self._engines)
+
+    def _get_engine(self, name: str) -> Engine:
+        if name not in self._engines:
+            self._initialize_database()
+        return self._engines[name]
+
     def _initialize_database(self):
-        """Initialize database connection and create tables"""
-        try:
-            # Build connection URL
-            db_url = self._build_database_url()
-            
-            # Create engine with connection pooling
-            self.engine = create_engine(
-                db_url,
-                poolclass=QueuePool,
-                pool_size=10,
-                max_overflow=20,
-                pool_pre_ping=True,
-                echo=False  # Set to True for SQL debugging
-            )
-            
-            # Create session factory
-            self.SessionLocal = sessionmaker(
-                autocommit=False, 
-                autoflush=False, 
-                bind=self.engine
-            )
-            
-            # Create all tables
-            self._create_tables()
-            
-            logger.info("✅ Database initialized successfully", 
-                       database=os.getenv('DB_DATABASE', 'analytics_service'))
-            
-        except Exception as e:
-            logger.error("❌ Failed to initialize database", error=str(e))
-            raise
-    
+        """Create the engines and session factories (does not connect)"""
+        with self._lock:
+            if self._engines:
+                return
+
+            try:
+                # Build connection URL
+                db_url = self._build_database_url()
+
+                engines = {}
+                for name, settings in POOL_SETTINGS.items():
+                    # Create engine with connection pooling
+                    engines[name] = create_engine(
+                        db_url,
+                        poolclass=QueuePool,
+                        pool_pre_ping=True,
+                        echo=False,  # Set to True for SQL debugging
+                        **settings
+                    )
+
+                    # Create session factory
+                    self._session_factories[name] = sessionmaker(
+                        autocommit=False,
+                        autoflush=False,
+                        bind=engines[name]
+                    )
+                self._engines = engines
+
+                logger.info("✅ Database engines initialized",
+                           database=os.getenv('DB_DATABASE', 'analytics_service'),
+                           pools={name: settings["pool_size"] + settings["max_overflow"]
+                                  for name, settings in POOL_SETTINGS.items()})
+
+            except Exception as e:
+                logger.error("❌ Failed to initialize database", error=str(e))
+                raise
+
     def _build_database_url(self) -> str:
         """Build PostgreSQL connection URL from environment variables"""
+        # Full URL override (e.g. a local SQLite file for benchmarks)
+        if os.getenv('DATABASE_URL'):
+            return os.getenv('DATABASE_URL')
+
         host = os.getenv('DB_HOST', 'localhost')
         port = os.getenv('DB_PORT', '5432')
         database = os.getenv('DB_DATABASE', 'analytics_service')
         username = os.getenv('DB_USERNAME', 'postgres')
         password = os.getenv('DB_PASSWORD', 'password')
-        
+
         return f"postgresql://{username}:{password}@{host}:{port}/{database}"
-    
-    def _create_tables(self):
-        """Create all database tables"""
+
+    def run_migrations(self, revision: str = 'head'):
+        """Upgrade the schema with Alembic.
+
+        Databases created by the old import-time `create_all` have the tables
+        but no `alembic_version`; those are stamped at the initial revision first.
+        """
+        from alembic import command
+        from alembic.config import Config
+
+        try:
+            with self.engine.begin() as connection:
+                config = Config(ALEMBIC_INI)
+                config.attributes['connection'] = connection
+
+                tables = set(inspect(connection).get_table_names())
+                if 'alembic_version' not in tables and 'user_registration_events' in tables:
+                    logger.info("📌 Stamping pre-Alembic schema", revision=INITIAL_REVISION)
+                    command.stamp(config, INITIAL_REVISION)
+
+                command.upgrade(config, revision)
+
+            logger.info("📊 Database schema migrated", revision=revision)
+        except Exception as e:
+            logger.error("❌ Failed to run migrations", error=str(e))
+            raise
+
+    def create_tables(self):
+        """Create all tables directly from the models (SQLite benchmarks and scratch databases)"""
         try:
             Base.metadata.create_all(bind=self.engine)
             logger.info("📊 Database tables created/verified")
         except Exception as e:
             logger.error("❌ Failed to create tables", error=str(e))
             raise
-    
+
     def get_session(self) -> Session:
-        """Get database session"""
-        if not self.SessionLocal:
-            raise RuntimeError("Database not initialized")
+        """Get database session (query pool)"""
         return self.SessionLocal()
-    
+
+    def get_ingest_session(self) -> Session:
+        """Get database session from the ingest pool"""
+        if "ingest" not in self._session_factories:
+            self._initialize_database()
+        return self._session_factories["ingest"]()
+
+    def pool_saturation(self, name: str) -> float:
+        """Fraction of a pool's connections (including overflow) currently checked out"""
+        engine = self._engines.get(name)
+        if engine is None:
+            return 0.0
+        settings = POOL_SETTINGS[name]
+        return engine.pool.checkedout() / (settings["pool_size"] + settings["max_overflow"])
+
+    def pool_status(self) -> Dict:
+        """Checkout counts and saturation per pool"""
+        status = {}
+        for name, settings in POOL_SETTINGS.items():
+            engine = self._engines.get(name)
+            status[name] = {
+                "checked_out": engine.pool.checkedout() if engine else 0,
+                "max_connections": settings["pool_size"] + settings["max_overflow"],
+                "timeout_seconds": settings["pool_timeout"],
+                "saturation": round(self.pool_saturation(name), 3),
+            }
+        return status
+
     def close(self):
         """Close database connections"""
-        if self.engine:
-            self.engine.dispose()
+        if self._engines:
+            for engine in self._engines.values():
+                engine.dispose()
             logger.info("🔒 Database connections closed")
 
-# Global database manager instance
+# Global database manager instance (no connection is made until first use)
 db_manager = DatabaseManager()
-
-def get_db() -> Session:
-    """Dependency for FastAPI to get database session"""
-    db = db_manager.get_session()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
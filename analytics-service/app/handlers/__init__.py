@@ -0,0 +1,6 @@
+from app.handlers.base import EventHandler, HandlerRegistry, handler_registry, register_handler
+
+# Importing the handler modules registers them
+from app.handlers import registration, deposit  # noqa: E402,F401
+
+__all__ = ["EventHandler", "HandlerRegistry", "handler_registry", "register_handler"]
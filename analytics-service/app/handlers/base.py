@@ -0,0 +1,67 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy.orm import Session
+
+class EventHandler(ABC):
+    """Base class for event handlers dispatched by the RabbitMQ consumer.
+
+    A handler owns one queue bound to `event_type` on the `user.events`
+    exchange. Messages are decoded one by one and committed in batches of up
+    to `batch_size`; `prefetch_count` caps the unacked messages in flight on
+    the handler's channel. All three knobs can be overridden with
+    `<env_prefix>_BATCH_SIZE`, `<env_prefix>_PREFETCH` and `<env_prefix>_FLUSH_SECONDS`.
+    """
+    event_type: str = ""
+    queue_name: str = ""
+    env_prefix: str = ""
+    batch_size: int = 1
+    prefetch_count: int = 1
+    flush_interval: float = 0.5
+
+    def __init__(self):
+        self.batch_size = max(int(os.getenv(f"{self.env_prefix}_BATCH_SIZE", self.batch_size)), 1)
+        # A batch can only fill if at least that many messages may be in flight
+        self.prefetch_count = max(int(os.getenv(f"{self.env_prefix}_PREFETCH", self.prefetch_count)), self.batch_size)
+        self.flush_interval = float(os.getenv(f"{self.env_prefix}_FLUSH_SECONDS", self.flush_interval))
+        self.processed = 0
+        self.last_update: Optional[Dict] = None
+
+    @property
+    def routing_key(self) -> str:
+        return self.event_type
+
+    @abstractmethod
+    def decode(self, message: Dict) -> Optional[object]:
+        """Turn a parsed message into the handler's event value, or None if it is invalid"""
+
+    @abstractmethod
+    def process_batch(self, db: Session, events: List) -> bool:
+        """Persist a batch in a single transaction; set `last_update` for live subscribers"""
+
+    def report(self, db: Session, events: List):
+        """Console output after a batch has been committed"""
+
+class HandlerRegistry:
+    """Maps event types (routing keys) to their handler instances"""
+    def __init__(self):
+        self._handlers: Dict[str, EventHandler] = {}
+
+    def register(self, handler_class):
+        """Class decorator registering a handler instance for its event type"""
+        handler = handler_class()
+        self._handlers[handler.event_type] = handler
+        return handler_class
+
+    def get(self, event_type: Optional[str]) -> Optional[EventHandler]:
+        return self._handlers.get(event_type)
+
+    def __iter__(self) -> Iterator[EventHandler]:
+        return iter(self._handlers.values())
+
+    def __len__(self) -> int:
+        return len(self._handlers)
+
+# Global handler registry
+handler_registry = HandlerRegistry()
+register_handler = handler_registry.register
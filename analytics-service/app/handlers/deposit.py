@@ -0,0 +1,30 @@
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from colorama import Fore
+from app.handlers.base import EventHandler, register_handler
+from app.models.events import DepositEvent, decode_deposit
+from app.services.deposit_analytics_service import DepositAnalyticsService
+
+@register_handler
+class WalletDepositHandler(EventHandler):
+    """Deposit volume analytics: per-hour sums and counts"""
+    event_type = "user.wallet.deposit"
+    queue_name = "analytics.user.wallet.deposit"
+    env_prefix = "ANALYTICS_DEPOSIT"
+    batch_size = 50
+    prefetch_count = 100
+
+    def decode(self, message: Dict) -> Optional[DepositEvent]:
+        return decode_deposit(message.get('data') or {}, message.get('timestamp'))
+
+    def process_batch(self, db: Session, events: List[DepositEvent]) -> bool:
+        return DepositAnalyticsService(db).process_deposit_batch(events)
+
+    def report(self, db: Session, events: List[DepositEvent]):
+        total = sum(event.amount for event in events)
+        print(f"\n{Fore.GREEN}💰 DEPOSIT ANALYTICS PROCESSED")
+        print(f"{Fore.GREEN}{'='*50}")
+        print(f"{Fore.GREEN}💵 Deposits in batch: {len(events)}")
+        print(f"{Fore.GREEN}💲 Batch volume: {total}")
+        print(f"{Fore.GREEN}⏰ Updated hourly deposit totals")
+        print(f"{Fore.GREEN}{'='*50}")
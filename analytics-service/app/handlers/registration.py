@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+import structlog
+from colorama import Fore
+from app.handlers.base import EventHandler, register_handler
+from app.models.events import RegistrationEvent, decode_registration
+from app.services.analytics_service import AnalyticsService
+
+logger = structlog.get_logger(__name__)
+
+@register_handler
+class UserRegistrationHandler(EventHandler):
+    """Registration analytics: events, domains, hourly and daily aggregates"""
+    event_type = "user.registered"
+    queue_name = "analytics.user.registered"
+    env_prefix = "ANALYTICS_REGISTRATION"
+    batch_size = 25
+    prefetch_count = 50
+
+    def decode(self, message: Dict) -> Optional[RegistrationEvent]:
+        return decode_registration(message.get('data') or {})
+
+    def process_batch(self, db: Session, events: List[RegistrationEvent]) -> bool:
+        analytics_service = AnalyticsService(db)
+        success = analytics_service.process_registration_batch(events)
+        self.last_update = analytics_service.last_update if success else None
+        return success
+
+    def report(self, db: Session, events: List[RegistrationEvent]):
+        for event in events:
+            print(f"\n{Fore.GREEN}📊 ANALYTICS PROCESSED")
+            print(f"{Fore.GREEN}{'='*50}")
+            print(f"{Fore.GREEN}🎯 User Analytics Updated!")
+            print(f"{Fore.GREEN}┌─────────────────────────────────────┐")
+            print(f"{Fore.GREEN}│ 👤 Name: {event.name:<23} │")
+            print(f"{Fore.GREEN}│ 📧 Email: {event.email:<22} │")
+            print(f"{Fore.GREEN}│ 🏷️  Domain: {event.email_domain:<21} │")
+            print(f"{Fore.GREEN}│ 🆔 ID: {event.user_id:<27} │")
+            print(f"{Fore.GREEN}└─────────────────────────────────────┘")
+        print(f"{Fore.GREEN}📈 Stored in analytics database")
+        print(f"{Fore.GREEN}📊 Updated domain statistics")
+        print(f"{Fore.GREEN}⏰ Updated hourly trends")
+        print(f"{Fore.GREEN}📅 Updated daily aggregates")
+        print(f"{Fore.GREEN}{'='*50}")
+
+        # Show summary every 5 registrations
+        if self.processed // 5 > (self.processed - len(events)) // 5:
+            self._show_analytics_summary(AnalyticsService(db))
+
+    def _show_analytics_summary(self, analytics_service: AnalyticsService):
+        """Show analytics summary every few messages"""
+        try:
+            stats = analytics_service.get_dashboard_stats()
+            
+            print(f"\n{Fore.MAGENTA}📊 ANALYTICS SUMMARY")
+            print(f"{Fore.MAGENTA}{'='*60}")
+            print(f"{Fore.MAGENTA}Total registrations processed: {stats.get('total_registrations', 0)}")
+            print(f"{Fore.MAGENTA}Unique email domains: {stats.get('unique_domains', 0)}")
+            print(f"{Fore.MAGENTA}Today's registrations: {stats.get('today_registrations', 0)}")
+            
+            top_domains = stats.get('top_domains', [])[:3]
+            if top_domains:
+                print(f"{Fore.MAGENTA}Top domains:")
+                for i, domain in enumerate(top_domains, 1):
+                    print(f"{Fore.MAGENTA}  {i}. {domain['domain']} ({domain['count']} users)")
+            
+            print(f"{Fore.MAGENTA}{'='*60}")
+            
+        except Exception as e:
+            logger.error("Failed to show analytics summary", error=str(e))
@@ -1,14 +1,18 @@
+import asyncio
 import os
 import threading
-import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import structlog
+from apscheduler.schedulers.background import BackgroundScheduler
 from colorama import init, Fore, Style
 from app.api.analytics_routes import router as analytics_router
+from app.api.admin_routes import router as admin_router
+from app.api.dependencies import admission
 from app.services.rabbitmq_consumer import consumer
 from app.database.connection import db_manager
+from app.services.archive_service import ParquetArchiver
 
 # Initialize colorama for colored output
 init(autoreset=True)
@@ -43,6 +47,16 @@ def start_rabbitmq_consumer():
         logger.error("RabbitMQ consumer failed", error=str(e))
         print(f"{Fore.RED}❌ RabbitMQ consumer failed: {e}")
 
+def archive_closed_days():
+    """Scheduled export of closed days to the Parquet archive"""
+    db = db_manager.get_session()
+    try:
+        ParquetArchiver(db).run()
+    except Exception as e:
+        logger.error("Scheduled archive failed", error=str(e))
+    finally:
+        db.close()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management"""
@@ -54,17 +68,29 @@ async def lifespan(app: FastAPI):
     print(f"{Fore.GREEN}🌍 Environment: {os.getenv('ENVIRONMENT', 'development')}")
     print(f"{Fore.GREEN}📊 Health check: http://localhost:4000/api/analytics/health")
     print(f"{Fore.GREEN}📈 Dashboard API: http://localhost:4000/api/analytics/dashboard")
+    print(f"{Fore.GREEN}📡 Live stream: http://localhost:4000/api/analytics/stream")
     print(f"{Fore.GREEN}📖 API Docs: http://localhost:4000/docs")
     print(f"{Fore.GREEN}{'='*60}\n")
     
     logger.info("Analytics service starting up")
     
-    # Start RabbitMQ consumer in background thread
-    consumer_thread = threading.Thread(target=start_rabbitmq_consumer, daemon=True)
+    # Bring the schema up to date before the consumer writes to it
+    # (set DB_AUTO_MIGRATE=false when migrations run as a separate deploy step)
+    if os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true':
+        await asyncio.to_thread(db_manager.run_migrations)
+    
+    # Start RabbitMQ consumer in background thread; it connects on its own
+    # with retries, so startup does not wait for it
+    consumer_thread = threading.Thread(target=start_rabbitmq_consumer, name="rabbitmq-consumer", daemon=True)
     consumer_thread.start()
     
-    # Give the consumer a moment to start
-    time.sleep(2)
+    # Periodically move closed days into the Parquet archive (0 disables)
+    scheduler = BackgroundScheduler(timezone="UTC")
+    archive_interval = int(os.getenv('ANALYTICS_ARCHIVE_INTERVAL_MINUTES', 60))
+    if archive_interval > 0:
+        scheduler.add_job(archive_closed_days, "interval", minutes=archive_interval,
+                          id="parquet-archive", max_instances=1, coalesce=True)
+        scheduler.start()
     
     yield
     
@@ -72,7 +98,9 @@ async def lifespan(app: FastAPI):
     print(f"\n{Fore.YELLOW}🔄 Shutting down Analytics Service...")
     logger.info("Analytics service shutting down")
     
-    # Stop RabbitMQ consumer
+    # Stop background jobs and the RabbitMQ consumer
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
     consumer.stop_consuming()
     
     # Close database connections
@@ -101,6 +129,7 @@ app.add_middleware(
 
 # Include API routes
 app.include_router(analytics_router)
+app.include_router(admin_router)
 
 @app.get("/")
 def root():
@@ -119,8 +148,11 @@ def health():
     return {
         "service": "analytics-service",
         "status": "healthy",
-        "database": "connected" if db_manager.engine else "disconnected",
-        "rabbitmq": "consuming" if consumer.is_consuming else "disconnected"
+        "database": "connected" if db_manager.is_initialized else "disconnected",
+        "rabbitmq": "consuming" if consumer.is_consuming else "disconnected",
+        "pools": db_manager.pool_status(),
+        "shed_requests": admission["shed_requests"],
+        "prefetch": {event_type: prefetch.to_dict() for event_type, prefetch in consumer.prefetch.items()}
     }
 
 if __name__ == "__main__":
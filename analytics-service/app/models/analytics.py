@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Index
+from sqlalchemy import Column, Integer, String, DateTime, Float, Numeric, Text, Boolean, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime, timezone
@@ -65,4 +65,47 @@ class DomainAnalytics(Base):
     last_seen = Column(DateTime(timezone=True), nullable=False)
     percentage_of_total = Column(Float, default=0.0)
     is_popular = Column(String(10), default='Unknown')  # Popular, Common, Rare
-    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+class WalletDepositEvent(Base):
+    """Store individual wallet deposit events"""
+    __tablename__ = "wallet_deposit_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    email = Column(String(255), nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    wallet_balance = Column(Numeric(14, 2))
+    deposit_time = Column(DateTime(timezone=True), nullable=False, index=True)
+    processed_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
+
+class HourlyDepositAnalytics(Base):
+    """Store hourly aggregated deposit volume"""
+    __tablename__ = "hourly_deposit_analytics"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hour_start = Column(DateTime(timezone=True), nullable=False, unique=True, index=True)
+    deposits_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Numeric(14, 2), default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+class BucketWatermark(Base):
+    """Event-time progress of an hour/day bucket; sealed buckets are final"""
+    __tablename__ = "bucket_watermarks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(10), nullable=False)  # hour, day
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    bucket_end = Column(DateTime(timezone=True), nullable=False)
+    event_count = Column(Integer, default=0, nullable=False)
+    max_event_time = Column(DateTime(timezone=True), nullable=False)
+    last_processed_at = Column(DateTime(timezone=True), nullable=False)
+    late_events = Column(Integer, default=0, nullable=False)  # arrived after the bucket was sealed
+    revision = Column(Integer, default=0, nullable=False)  # bumped whenever a sealed bucket reopens
+    sealed = Column(Boolean, default=False, nullable=False)
+    sealed_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        UniqueConstraint('granularity', 'bucket_start', name='uq_bucket_watermark'),
+        Index('idx_bucket_watermark_open', 'granularity', 'sealed', 'bucket_start'),
+    )
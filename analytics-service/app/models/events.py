@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional
+
+@dataclass(slots=True, frozen=True)
+class RegistrationEvent:
+    """Decoded `user.registered` payload with its buckets precomputed.
+
+    Lightweight value type for the consumer hot path: no ORM instrumentation,
+    no identity-map tracking, and domain/hour/day are derived exactly once.
+    """
+    user_id: int
+    name: str
+    email: str
+    email_domain: str
+    registration_time: datetime
+    hour_start: datetime
+    day: datetime
+
+@dataclass(slots=True, frozen=True)
+class DepositEvent:
+    """Decoded `user.wallet.deposit` payload"""
+    user_id: int
+    email: str
+    amount: Decimal
+    wallet_balance: Optional[Decimal]
+    deposit_time: datetime
+    hour_start: datetime
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO-8601 timestamp as published by user-service (trailing 'Z' allowed) into UTC.
+
+    Naive timestamps are taken to be UTC; offsets are converted so hour and day
+    buckets always start on UTC boundaries.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def extract_email_domain(email: str) -> str:
+    """Lower-cased domain part of an email address ('unknown' if there is none)"""
+    _, at, domain = email.rpartition('@')
+    return domain.lower() if at else 'unknown'
+
+def decode_registration(event_data: Dict) -> Optional[RegistrationEvent]:
+    """Build a RegistrationEvent from the message `data` dict, or None if it is invalid"""
+    user_id = event_data.get('user_id')
+    name = event_data.get('name')
+    email = event_data.get('email')
+    created_at = event_data.get('created_at')
+
+    if not (user_id and name and email and created_at):
+        return None
+
+    try:
+        reg_time = parse_timestamp(created_at)
+    except (AttributeError, ValueError):
+        return None
+
+    return RegistrationEvent(
+        user_id=user_id,
+        name=name,
+        email=email,
+        email_domain=extract_email_domain(email),
+        registration_time=reg_time,
+        hour_start=reg_time.replace(minute=0, second=0, microsecond=0),
+        day=datetime.combine(reg_time.date(), time.min, tzinfo=timezone.utc),
+    )
+
+def decode_deposit(event_data: Dict, timestamp: Optional[str]) -> Optional[DepositEvent]:
+    """Build a DepositEvent from the message `data` dict and envelope timestamp, or None if invalid.
+
+    The payload's `created_at` is the user's creation time, so the deposit is
+    bucketed by the message `timestamp` instead.
+    """
+    user_id = event_data.get('user_id')
+    email = event_data.get('email')
+    amount = event_data.get('amount')
+
+    if not (user_id and email and amount is not None and timestamp):
+        return None
+
+    try:
+        deposit_time = parse_timestamp(timestamp)
+        amount = Decimal(str(amount))
+        balance = event_data.get('wallet_balance')
+        wallet_balance = Decimal(str(balance)) if balance is not None else None
+    except (AttributeError, ValueError, InvalidOperation):
+        return None
+
+    return DepositEvent(
+        user_id=user_id,
+        email=email,
+        amount=amount,
+        wallet_balance=wallet_balance,
+        deposit_time=deposit_time,
+        hour_start=deposit_time.replace(minute=0, second=0, microsecond=0),
+    )
@@ -1,9 +1,8 @@
 import json
-import pandas as pd
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, insert, update, select, case
 import structlog
 from app.models.analytics import (
     UserRegistrationEvent, 
@@ -11,124 +10,179 @@ from app.models.analytics import (
     HourlyAnalytics, 
     DomainAnalytics
 )
+from app.models.events import RegistrationEvent, decode_registration
+from app.services.watermark_service import WatermarkService, lag_histogram, newest_event_time, sealed_hour_cache
 
 logger = structlog.get_logger(__name__)
 
+# Core tables for the ingest path (bypasses the ORM unit of work)
+events_table = UserRegistrationEvent.__table__
+domain_table = DomainAnalytics.__table__
+hourly_table = HourlyAnalytics.__table__
+daily_table = DailyAnalytics.__table__
+
 class AnalyticsService:
     def __init__(self, db: Session):
         self.db = db
+        self.last_update: Optional[Dict] = None
     
     def process_user_registration(self, event_data: Dict) -> bool:
         """Process a user registration event and update analytics"""
+        event = decode_registration(event_data)
+        if event is None:
+            logger.error("❌ Missing required fields in event data", data=event_data)
+            return False
+        
+        return self.process_registration_event(event)
+    
+    def process_registration_event(self, event: RegistrationEvent) -> bool:
+        """Store a decoded registration event and update aggregates"""
+        return self.process_registration_batch([event])
+    
+    def process_registration_batch(self, events: List[RegistrationEvent]) -> bool:
+        """Store a batch of decoded registration events and update aggregates in one transaction.
+
+        Events are inserted with a single executemany and every aggregate row
+        touched by the batch is updated once with Core statements.
+        """
         try:
-            # Extract event data
-            user_id = event_data.get('user_id')
-            name = event_data.get('name')
-            email = event_data.get('email')
-            created_at = event_data.get('created_at')
+            # Store individual events
+            processed_at = datetime.now(timezone.utc)
+            self._store_registration_events(events, processed_at)
             
-            if not all([user_id, name, email, created_at]):
-                logger.error("❌ Missing required fields in event data", data=event_data)
-                return False
+            # Fold the batch into per-bucket increments
+            domains: Dict[str, List] = {}
+            hours: Dict[datetime, int] = {}
+            days: Dict[datetime, int] = {}
+            for event in events:
+                stats = domains.get(event.email_domain)
+                if stats is None:
+                    domains[event.email_domain] = [1, event.registration_time, event.registration_time]
+                else:
+                    stats[0] += 1
+                    stats[1] = min(stats[1], event.registration_time)
+                    stats[2] = max(stats[2], event.registration_time)
+                hours[event.hour_start] = hours.get(event.hour_start, 0) + 1
+                days[event.day] = days.get(event.day, 0) + 1
             
-            # Parse registration time
-            reg_time = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+            # Update aggregated analytics
+            self._update_domain_analytics(domains)
+            hour_counts = {hour: self._update_hourly_analytics(hour, count) for hour, count in hours.items()}
+            for day, count in days.items():
+                self._update_daily_analytics(day, count)
             
-            # Extract email domain
-            email_domain = email.split('@')[1].lower() if '@' in email else 'unknown'
+            # Advance event-time watermarks and seal buckets that are now final
+            reopened_hours = WatermarkService(self.db).observe_registrations(events, processed_at)
             
-            # Store individual event
-            self._store_registration_event(user_id, name, email, email_domain, reg_time)
+            self.db.commit()
             
-            # Update aggregated analytics
-            self._update_domain_analytics(email_domain, reg_time)
-            self._update_hourly_analytics(reg_time)
-            self._update_daily_analytics(reg_time.date())
+            newest_event_time.advance(max(event.registration_time for event in events))
+            sealed_hour_cache.invalidate(reopened_hours)
+            lag_histogram.observe_many(
+                (processed_at - event.registration_time).total_seconds() for event in events
+            )
             
-            self.db.commit()
+            # Compact delta for live stream subscribers (no extra queries)
+            current_hour = events[-1].hour_start
+            self.last_update = {
+                "new_registrations": len(events),
+                "domains": {domain: stats[0] for domain, stats in domains.items()},
+                "current_hour": {
+                    "hour_start": current_hour.isoformat(),
+                    "registrations": hour_counts[current_hour]
+                }
+            }
             
             logger.info("📊 Analytics updated successfully", 
-                       user_id=user_id, email=email, domain=email_domain)
+                       events=len(events), domains=len(domains), last_user_id=events[-1].user_id)
             
             return True
             
         except Exception as e:
-            logger.error("❌ Failed to process registration event", error=str(e))
+            logger.error("❌ Failed to process registration events", error=str(e), events=len(events))
             self.db.rollback()
             return False
     
-    def _store_registration_event(self, user_id: int, name: str, email: str, 
-                                 domain: str, reg_time: datetime):
-        """Store individual registration event"""
-        event = UserRegistrationEvent(
-            user_id=user_id,
-            name=name,
-            email=email,
-            email_domain=domain,
-            registration_time=reg_time
-        )
-        self.db.add(event)
+    def _store_registration_events(self, events: List[RegistrationEvent], processed_at: datetime):
+        """Store individual registration events"""
+        self.db.execute(insert(events_table), [
+            {
+                "user_id": event.user_id,
+                "name": event.name,
+                "email": event.email,
+                "email_domain": event.email_domain,
+                "registration_time": event.registration_time,
+                "processed_at": processed_at
+            }
+            for event in events
+        ])
     
-    def _update_domain_analytics(self, domain: str, reg_time: datetime):
-        """Update domain-specific analytics"""
-        domain_analytics = self.db.query(DomainAnalytics).filter_by(domain=domain).first()
+    def _update_domain_analytics(self, domains: Dict[str, List]):
+        """Update domain-specific analytics from {domain: [count, first_seen, last_seen]}"""
+        total_users = self.db.execute(select(func.count()).select_from(events_table)).scalar() or 1
         
-        if domain_analytics:
-            # Update existing domain
-            domain_analytics.total_registrations += 1
-            domain_analytics.last_seen = reg_time
-        else:
-            # Create new domain entry
-            domain_analytics = DomainAnalytics(
-                domain=domain,
-                total_registrations=1,
-                first_seen=reg_time,
-                last_seen=reg_time
+        for domain, (count, first_seen, last_seen) in domains.items():
+            # Classify domain popularity from the incremented count
+            new_total = domain_table.c.total_registrations + count
+            percentage = new_total * 100.0 / total_users
+            result = self.db.execute(
+                update(domain_table)
+                .where(domain_table.c.domain == domain)
+                .values(
+                    total_registrations=new_total,
+                    last_seen=last_seen,
+                    percentage_of_total=percentage,
+                    is_popular=case(
+                        (percentage >= 10, 'Popular'),
+                        (percentage >= 1, 'Common'),
+                        else_='Rare'
+                    )
+                )
             )
-            self.db.add(domain_analytics)
-        
-        # Classify domain popularity
-        total_users = self.db.query(func.count(UserRegistrationEvent.id)).scalar()
-        if total_users > 0:
-            percentage = (domain_analytics.total_registrations / total_users) * 100
-            domain_analytics.percentage_of_total = percentage
-            
-            if percentage >= 10:
-                domain_analytics.is_popular = 'Popular'
-            elif percentage >= 1:
-                domain_analytics.is_popular = 'Common'
-            else:
-                domain_analytics.is_popular = 'Rare'
+            
+            if result.rowcount == 0:
+                # Create new domain entry
+                percentage = count * 100.0 / total_users
+                self.db.execute(insert(domain_table).values(
+                    domain=domain,
+                    total_registrations=count,
+                    first_seen=first_seen,
+                    last_seen=last_seen,
+                    percentage_of_total=percentage,
+                    is_popular='Popular' if percentage >= 10 else 'Common' if percentage >= 1 else 'Rare'
+                ))
     
-    def _update_hourly_analytics(self, reg_time: datetime):
-        """Update hourly analytics"""
-        hour_start = reg_time.replace(minute=0, second=0, microsecond=0)
-        
-        hourly = self.db.query(HourlyAnalytics).filter_by(hour_start=hour_start).first()
+    def _update_hourly_analytics(self, hour_start: datetime, count: int) -> int:
+        """Update hourly analytics and return the bucket's new count"""
+        new_count = self.db.execute(
+            update(hourly_table)
+            .where(hourly_table.c.hour_start == hour_start)
+            .values(registrations_count=hourly_table.c.registrations_count + count)
+            .returning(hourly_table.c.registrations_count)
+        ).scalar()
         
-        if hourly:
-            hourly.registrations_count += 1
-        else:
-            hourly = HourlyAnalytics(
+        if new_count is None:
+            self.db.execute(insert(hourly_table).values(
                 hour_start=hour_start,
-                registrations_count=1
-            )
-            self.db.add(hourly)
+                registrations_count=count
+            ))
+            new_count = count
+        
+        return new_count
     
-    def _update_daily_analytics(self, reg_date):
+    def _update_daily_analytics(self, day: datetime, count: int):
         """Update daily analytics"""
-        daily = self.db.query(DailyAnalytics).filter(
-            func.date(DailyAnalytics.date) == reg_date
-        ).first()
+        result = self.db.execute(
+            update(daily_table)
+            .where(daily_table.c.date == day)
+            .values(total_registrations=daily_table.c.total_registrations + count)
+        )
         
-        if daily:
-            daily.total_registrations += 1
-        else:
-            daily = DailyAnalytics(
-                date=datetime.combine(reg_date, datetime.min.time()).replace(tzinfo=timezone.utc),
-                total_registrations=1
-            )
-            self.db.add(daily)
+        if result.rowcount == 0:
+            self.db.execute(insert(daily_table).values(
+                date=day,
+                total_registrations=count
+            ))
     
     def get_dashboard_stats(self) -> Dict:
         """Get comprehensive dashboard statistics"""
@@ -187,25 +241,49 @@ class AnalyticsService:
             return {}
     
     def get_hourly_trends(self, days: int = 7) -> List[Dict]:
-        """Get hourly registration trends for the last N days"""
+        """Get hourly registration trends for the last N days.
+
+        Sealed hours come from the process-wide cache; only hours after the
+        sealed-through point are read from the database on every call.
+        """
         try:
             start_date = datetime.now(timezone.utc) - timedelta(days=days)
+            first_hour = start_date.replace(minute=0, second=0, microsecond=0)
+            if first_hour < start_date:
+                first_hour += timedelta(hours=1)
             
-            hourly_data = self.db.query(
+            sealed_through = WatermarkService(self.db).sealed_through("hour")
+            sealed_counts = {}
+            open_from = first_hour
+            if sealed_through is not None and sealed_through > first_hour:
+                sealed_counts = sealed_hour_cache.read(self.db, first_hour, sealed_through)
+                open_from = sealed_through
+            
+            open_data = self.db.query(
                 HourlyAnalytics.hour_start,
                 HourlyAnalytics.registrations_count
             ).filter(
-                HourlyAnalytics.hour_start >= start_date
+                HourlyAnalytics.hour_start >= open_from
             ).order_by(HourlyAnalytics.hour_start).all()
             
-            return [
+            trends = [
                 {
                     "timestamp": hour_start.isoformat(),
-                    "registrations": count
+                    "registrations": count,
+                    "sealed": True
                 }
-                for hour_start, count in hourly_data
+                for hour_start, count in sorted(sealed_counts.items())
             ]
+            trends.extend(
+                {
+                    "timestamp": hour_start.isoformat(),
+                    "registrations": count,
+                    "sealed": False
+                }
+                for hour_start, count in open_data
+            )
+            return trends
             
         except Exception as e:
             logger.error("❌ Failed to get hourly trends", error=str(e))
-            return []
\ No newline at end of file
+            return []
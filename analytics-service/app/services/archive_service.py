@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+import structlog
+from app.models.analytics import UserRegistrationEvent
+
+logger = structlog.get_logger(__name__)
+
+events_table = UserRegistrationEvent.__table__
+
+# Archive location and how long after midnight (UTC) a day is considered closed
+ARCHIVE_DIR = os.getenv('ANALYTICS_ARCHIVE_DIR', 'archive')
+ARCHIVE_GRACE_HOURS = int(os.getenv('ANALYTICS_ARCHIVE_GRACE_HOURS', 6))
+ARCHIVE_CHUNK_ROWS = int(os.getenv('ANALYTICS_ARCHIVE_CHUNK_ROWS', 50000))
+
+REGISTRATION_DATASET = "user_registration_events"
+PARTITION_FILE = "part-0.parquet"
+MANIFEST_FILE = "_manifest.json"
+
+# Serializes archive runs (scheduler and admin endpoint) within the process
+_archive_lock = threading.Lock()
+
+def partition_dir(root: str, day: date) -> str:
+    """Hive-style partition directory for one day of events"""
+    return os.path.join(root, REGISTRATION_DATASET, f"date={day.isoformat()}")
+
+def archived_days(root: str) -> Set[date]:
+    """Days that already have a Parquet partition file"""
+    dataset_dir = os.path.join(root, REGISTRATION_DATASET)
+    if not os.path.isdir(dataset_dir):
+        return set()
+
+    days = set()
+    for entry in os.listdir(dataset_dir):
+        if entry.startswith("date="):
+            try:
+                day = date.fromisoformat(entry[len("date="):])
+            except ValueError:
+                continue
+            if os.path.exists(os.path.join(dataset_dir, entry, PARTITION_FILE)):
+                days.add(day)
+    return days
+
+def read_manifest(root: str, day: date) -> Optional[Dict]:
+    """Row count and newest processed_at recorded when the day was exported"""
+    try:
+        with open(os.path.join(partition_dir(root, day), MANIFEST_FILE)) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return None
+
+def _replace_file(path: str, write):
+    """Write via a temporary sibling and rename over `path` (atomic on POSIX)"""
+    staging = f"{path}.staging"
+    try:
+        write(staging)
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("name", pa.string()),
+        ("email", pa.string()),
+        ("email_domain", pa.string()),
+        ("registration_time", pa.timestamp("us", tz="UTC")),
+        ("processed_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    # SQLite returns naive datetimes; everything is stored in UTC
+    if value is None:
+        return None
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+
+def _utc_day(dialect_name: str):
+    """Dialect-specific UTC calendar day of registration_time, matching the partition boundaries"""
+    if dialect_name == "postgresql":
+        # date() alone follows the session TimeZone
+        return func.date(func.timezone('UTC', events_table.c.registration_time))
+    # SQLite stores the UTC wall time
+    return func.date(events_table.c.registration_time)
+
+class ParquetArchiver:
+    """Exports closed days of `user_registration_events` to date-partitioned Parquet.
+
+    A day is closed once ARCHIVE_GRACE_HOURS have passed since its end. Each
+    partition file is written to a staging file and renamed into place, so readers
+    never see a half-written day. A manifest records the row count and newest
+    `processed_at` exported; when late or backlogged events change either, the
+    day is exported again. Rows stay in Postgres; the archive only takes
+    long-range reads off it.
+    """
+    def __init__(self, db: Session, root: Optional[str] = None):
+        self.db = db
+        self.root = root or ARCHIVE_DIR
+
+    def closed_before(self) -> date:
+        """First day that is not yet closed"""
+        now = datetime.now(timezone.utc) - timedelta(hours=ARCHIVE_GRACE_HOURS)
+        return now.date()
+
+    def pending_days(self) -> List[date]:
+        """Closed days whose events are not (or no longer fully) in the archive"""
+        cutoff = datetime.combine(self.closed_before(), time.min, tzinfo=timezone.utc)
+        day_column = _utc_day(self.db.get_bind().dialect.name).label("day")
+        rows = self.db.execute(
+            select(day_column, func.count(), func.max(events_table.c.processed_at))
+            .where(events_table.c.registration_time < cutoff)
+            .group_by(day_column)
+        ).all()
+
+        archived = archived_days(self.root)
+        pending = []
+        for day, count, last_processed in rows:
+            day = day if isinstance(day, date) else date.fromisoformat(str(day))
+            manifest = read_manifest(self.root, day) if day in archived else None
+            if manifest is None or manifest["rows"] != count or \
+                    manifest["max_processed_at"] != _isoformat(last_processed):
+                pending.append(day)
+        return sorted(pending)
+
+    def export_day(self, day: date) -> int:
+        """Write one day's events to its partition and return the row count"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        day_start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        schema = _arrow_schema()
+        columns = [events_table.c[name] for name in schema.names]
+        query = (
+            select(*columns)
+            .where(events_table.c.registration_time >= day_start)
+            .where(events_table.c.registration_time < day_start + timedelta(days=1))
+            .order_by(events_table.c.registration_time)
+        )
+
+        target_dir = partition_dir(self.root, day)
+        os.makedirs(target_dir, exist_ok=True)
+
+        stats = {"rows": 0, "max_processed_at": None}
+        processed_index = schema.names.index("processed_at")
+
+        def write_partition(path: str):
+            result = self.db.execute(query.execution_options(stream_results=True, yield_per=ARCHIVE_CHUNK_ROWS))
+            with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+                for chunk in result.partitions(ARCHIVE_CHUNK_ROWS):
+                    batch = pa.RecordBatch.from_arrays(
+                        [pa.array([row[i] for row in chunk], type=field.type) for i, field in enumerate(schema)],
+                        schema=schema
+                    )
+                    writer.write_batch(batch)
+                    stats["rows"] += len(chunk)
+                    newest = max(row[processed_index] for row in chunk)
+                    if stats["max_processed_at"] is None or newest > stats["max_processed_at"]:
+                        stats["max_processed_at"] = newest
+
+        def write_manifest(path: str):
+            with open(path, "w") as manifest:
+                json.dump({
+                    "rows": stats["rows"],
+                    "max_processed_at": _isoformat(stats["max_processed_at"]),
+                    "exported_at": datetime.now(timezone.utc).isoformat(),
+                }, manifest)
+
+        # Publish the partition atomically (replacing an earlier export), then its manifest
+        _replace_file(os.path.join(target_dir, PARTITION_FILE), write_partition)
+        _replace_file(os.path.join(target_dir, MANIFEST_FILE), write_manifest)
+
+        return stats["rows"]
+
+    def run(self, max_days: Optional[int] = None) -> Dict:
+        """Archive every pending closed day (oldest first)"""
+        exported = {}
+        with _archive_lock:
+            days = self.pending_days()
+            if max_days:
+                days = days[:max_days]
+
+            for day in days:
+                exported[day.isoformat()] = self.export_day(day)
+                logger.info("🗄️ Archived day to Parquet", day=day.isoformat(), rows=exported[day.isoformat()])
+
+        return {
+            "archive_dir": os.path.abspath(self.root),
+            "closed_before": self.closed_before().isoformat(),
+            "days_archived": len(exported),
+            "rows_archived": sum(exported.values()),
+            "days": exported,
+        }
@@ -0,0 +1,116 @@
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, update
+import structlog
+from app.models.analytics import WalletDepositEvent, HourlyDepositAnalytics
+from app.models.events import DepositEvent
+
+logger = structlog.get_logger(__name__)
+
+# Core tables for the ingest path (bypasses the ORM unit of work)
+deposit_events_table = WalletDepositEvent.__table__
+hourly_deposit_table = HourlyDepositAnalytics.__table__
+
+class DepositAnalyticsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def process_deposit_batch(self, events: List[DepositEvent]) -> bool:
+        """Store a batch of wallet deposits and update hourly sums/counts in one transaction"""
+        try:
+            self.db.execute(insert(deposit_events_table), [
+                {
+                    "user_id": event.user_id,
+                    "email": event.email,
+                    "amount": event.amount,
+                    "wallet_balance": event.wallet_balance,
+                    "deposit_time": event.deposit_time
+                }
+                for event in events
+            ])
+
+            # Fold the batch into per-hour increments
+            hours: Dict[datetime, List] = {}
+            for event in events:
+                stats = hours.setdefault(event.hour_start, [0, Decimal(0)])
+                stats[0] += 1
+                stats[1] += event.amount
+
+            for hour_start, (count, amount) in hours.items():
+                self._update_hourly_deposits(hour_start, count, amount)
+
+            self.db.commit()
+
+            logger.info("💰 Deposit analytics updated successfully",
+                       events=len(events), hours=len(hours))
+
+            return True
+
+        except Exception as e:
+            logger.error("❌ Failed to process deposit events", error=str(e), events=len(events))
+            self.db.rollback()
+            return False
+
+    def _update_hourly_deposits(self, hour_start: datetime, count: int, amount: Decimal):
+        """Update hourly deposit volume"""
+        result = self.db.execute(
+            update(hourly_deposit_table)
+            .where(hourly_deposit_table.c.hour_start == hour_start)
+            .values(
+                deposits_count=hourly_deposit_table.c.deposits_count + count,
+                total_amount=hourly_deposit_table.c.total_amount + amount
+            )
+        )
+
+        if result.rowcount == 0:
+            self.db.execute(insert(hourly_deposit_table).values(
+                hour_start=hour_start,
+                deposits_count=count,
+                total_amount=amount
+            ))
+
+    def get_hourly_deposits(self, days: int = 7) -> List[Dict]:
+        """Get hourly deposit counts and sums for the last N days"""
+        try:
+            start_date = datetime.now(timezone.utc) - timedelta(days=days)
+
+            hourly_data = self.db.query(
+                HourlyDepositAnalytics.hour_start,
+                HourlyDepositAnalytics.deposits_count,
+                HourlyDepositAnalytics.total_amount
+            ).filter(
+                HourlyDepositAnalytics.hour_start >= start_date
+            ).order_by(HourlyDepositAnalytics.hour_start).all()
+
+            return [
+                {
+                    "timestamp": hour_start.isoformat(),
+                    "deposits": count,
+                    "total_amount": float(total or 0)
+                }
+                for hour_start, count, total in hourly_data
+            ]
+
+        except Exception as e:
+            logger.error("❌ Failed to get hourly deposits", error=str(e))
+            return []
+
+    def get_deposit_summary(self) -> Dict:
+        """Get overall deposit totals"""
+        try:
+            count, total = self.db.query(
+                func.count(WalletDepositEvent.id),
+                func.sum(WalletDepositEvent.amount)
+            ).one()
+
+            return {
+                "total_deposits": count or 0,
+                "total_amount": float(total or 0),
+                "average_amount": round(float(total) / count, 2) if count else 0
+            }
+
+        except Exception as e:
+            logger.error("❌ Failed to get deposit summary", error=str(e))
+            return {}
@@ -0,0 +1,103 @@
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import structlog
+from app.services.archive_service import ARCHIVE_DIR, PARTITION_FILE, archived_days, partition_dir
+
+logger = structlog.get_logger(__name__)
+
+HISTORY_THREADS = int(os.getenv('ANALYTICS_HISTORY_THREADS', 2))
+HISTORY_MEMORY_LIMIT = os.getenv('ANALYTICS_HISTORY_MEMORY_LIMIT', '512MB')
+
+class HistoryQueryService:
+    """Long-range analytics over the Parquet archive with an embedded DuckDB engine.
+
+    Partition pruning happens before DuckDB is involved: only the files for
+    days inside the requested range are handed to `read_parquet`, so a query
+    over one month never opens the other eleven. Nothing here touches Postgres.
+    """
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or ARCHIVE_DIR
+
+    def _partition_files(self, start: date, end: date) -> List[str]:
+        files = []
+        for day in sorted(archived_days(self.root)):
+            if start <= day <= end:
+                path = os.path.join(partition_dir(self.root, day), PARTITION_FILE)
+                if os.path.exists(path):
+                    files.append(path)
+        return files
+
+    def _query(self, files: List[str], sql: str, params: List) -> List[tuple]:
+        import duckdb
+
+        connection = duckdb.connect(database=":memory:")
+        try:
+            connection.execute(f"SET threads TO {HISTORY_THREADS}")
+            connection.execute(f"SET memory_limit = '{HISTORY_MEMORY_LIMIT}'")
+            return connection.execute(sql, [files] + params).fetchall()
+        finally:
+            connection.close()
+
+    def archived_range(self) -> Dict:
+        """First and last archived day"""
+        days = sorted(archived_days(self.root))
+        return {
+            "first_day": days[0].isoformat() if days else None,
+            "last_day": days[-1].isoformat() if days else None,
+            "partitions": len(days),
+        }
+
+    def get_domain_mix(self, start: date, end: date, limit: int = 10) -> List[Dict]:
+        """Registrations per email domain between two days (inclusive)"""
+        files = self._partition_files(start, end)
+        if not files:
+            return []
+
+        rows = self._query(files, """
+            SELECT email_domain, count(*) AS registrations,
+                   count(*) * 100.0 / sum(count(*)) OVER () AS percentage
+            FROM read_parquet(?)
+            GROUP BY email_domain
+            ORDER BY registrations DESC
+            LIMIT ?
+        """, [limit])
+
+        return [
+            {
+                "domain": domain,
+                "registrations": count,
+                "percentage": round(percentage, 2)
+            }
+            for domain, count, percentage in rows
+        ]
+
+    def get_daily_registrations(self, start: date, end: date) -> List[Dict]:
+        """Registrations and distinct domains per day between two days (inclusive)"""
+        files = self._partition_files(start, end)
+        if not files:
+            return []
+
+        rows = self._query(files, """
+            SELECT "date" AS day,
+                   count(*) AS registrations,
+                   count(DISTINCT email_domain) AS unique_domains
+            FROM read_parquet(?, hive_partitioning = true)
+            GROUP BY day
+            ORDER BY day
+        """, [])
+
+        # The day comes from the partition path rather than per-row timestamps
+        return [
+            {
+                "date": str(day),
+                "registrations": count,
+                "unique_domains": domains
+            }
+            for day, count, domains in rows
+        ]
+
+def default_range(days: int) -> tuple:
+    """(start, end) covering the last `days` UTC days up to yesterday"""
+    end = datetime.now(timezone.utc).date() - timedelta(days=1)
+    return end - timedelta(days=days - 1), end
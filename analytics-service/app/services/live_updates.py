@@ -0,0 +1,102 @@
+import asyncio
+import os
+import threading
+from typing import Dict, Optional, Set
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class Subscriber:
+    """A single live-stream client with at most one pending (coalesced) update"""
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.pending: Optional[Dict] = None
+        self.coalesced = 0
+        self._signaled = False
+
+    def merge(self, delta: Dict) -> bool:
+        """Fold a delta into the pending update. Returns True if the subscriber needs a wake-up."""
+        if self.pending is None:
+            self.pending = {
+                "new_registrations": delta["new_registrations"],
+                "domains": dict(delta["domains"]),
+                "current_hour": delta["current_hour"],
+            }
+        else:
+            self.coalesced += 1
+            self.pending["new_registrations"] += delta["new_registrations"]
+            domains = self.pending["domains"]
+            for domain, count in delta["domains"].items():
+                domains[domain] = domains.get(domain, 0) + count
+            self.pending["current_hour"] = delta["current_hour"]
+
+        if self._signaled:
+            return False
+        self._signaled = True
+        return True
+
+    def take(self) -> Optional[Dict]:
+        """Pop the pending update (called from the event loop)"""
+        update = self.pending
+        self.pending = None
+        self._signaled = False
+        self.event.clear()
+        if update is not None:
+            update["coalesced"] = self.coalesced
+            self.coalesced = 0
+        return update
+
+class LiveUpdateHub:
+    """In-process fan-out of analytics deltas from the consumer thread to stream clients.
+
+    Every subscriber holds a single pending update that new deltas are merged into,
+    so a slow client never queues more than one message and publishing costs no
+    database queries regardless of the number of subscribers.
+    """
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self.max_subscribers = int(os.getenv('ANALYTICS_STREAM_MAX_SUBSCRIBERS', 1000))
+        self.published_deltas = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """Register a subscriber bound to the running event loop, or None if the hub is full"""
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+        logger.info("Live stream subscriber connected", subscribers=len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        logger.info("Live stream subscriber disconnected", subscribers=len(self._subscribers))
+
+    def publish(self, delta: Dict):
+        """Publish a delta (safe to call from any thread)"""
+        with self._lock:
+            if not self._subscribers:
+                return
+            self.published_deltas += 1
+            to_wake = [s for s in self._subscribers if s.merge(delta)]
+
+        for subscriber in to_wake:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.event.set)
+            except RuntimeError:
+                # Event loop already closed; the stream generator will clean up
+                pass
+
+    def take(self, subscriber: Subscriber) -> Optional[Dict]:
+        with self._lock:
+            return subscriber.take()
+
+# Global hub instance
+live_updates = LiveUpdateHub()
@@ -0,0 +1,199 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import structlog
+from sqlalchemy import event
+
+logger = structlog.get_logger(__name__)
+
+# Per-connection stack of query start times, tagged with the session that pushed them
+_QUERY_START_KEY = "profiler_query_start"
+
+# Frames from these files are attributed to the app code that issued a query
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def _issuer(frame) -> str:
+    """Name of the innermost app function on the stack, e.g. AnalyticsService.get_dashboard_stats"""
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            owner = frame.f_locals.get('self')
+            if owner is not None:
+                return f"{type(owner).__name__}.{frame.f_code.co_name}"
+            module = os.path.splitext(os.path.basename(filename))[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<external>"
+
+class ProfilingSession:
+    """State of a single profiling run"""
+    def __init__(self, seconds: Optional[float], messages: Optional[int], interval: float):
+        self.seconds = seconds
+        self.messages = messages
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc)
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.finished_at: Optional[datetime] = None
+        self.messages_seen = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.sql = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+    def to_dict(self, include_folded: bool = True) -> Dict:
+        sql = [
+            {
+                "issuer": issuer,
+                "statement": statement,
+                "count": stats["count"],
+                "total_ms": round(stats["total_ms"], 3),
+                "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+            }
+            for (issuer, statement), stats in self.sql.items()
+        ]
+        sql.sort(key=lambda row: row["total_ms"], reverse=True)
+
+        result = {
+            "running": self.finished_at is None,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "limit_seconds": self.seconds,
+            "limit_messages": self.messages,
+            "interval_ms": self.interval * 1000,
+            "messages_seen": self.messages_seen,
+            "samples": self.samples,
+            "sql": sql,
+        }
+        if include_folded:
+            result["folded"] = self.folded()
+        return result
+
+    def folded(self) -> str:
+        """Collapsed stacks (flamegraph.pl / speedscope input), one `a;b;c count` per line"""
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+        )
+
+class SamplingProfiler:
+    """Opt-in, process-wide sampling profiler with SQL statement timing.
+
+    While a session runs, a background thread samples the stacks of every
+    thread (uvicorn workers and the RabbitMQ consumer alike) and SQLAlchemy
+    cursor events are timed per issuing app method. When no session is active
+    no listeners are installed and `message_processed` is a single flag check.
+    """
+    def __init__(self):
+        self.active = False
+        self.session: Optional[ProfilingSession] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._engines: List = []
+
+    def start(self, engines: List, seconds: Optional[float] = None, messages: Optional[int] = None,
+              interval: float = 0.005) -> bool:
+        """Start a session bounded by seconds and/or messages. Returns False if one is running."""
+        with self._lock:
+            if self.active:
+                return False
+
+            self.session = ProfilingSession(seconds, messages, interval)
+            self._engines = list(engines)
+            self._stop_event.clear()
+            for engine in self._engines:
+                event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+            self._thread = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+            self.active = True
+            self._thread.start()
+
+        logger.info("🔬 Profiling started", seconds=seconds, messages=messages, interval=interval)
+        return True
+
+    def stop(self) -> Optional[ProfilingSession]:
+        """Stop the running session (no-op if none) and return the last session"""
+        with self._lock:
+            if not self.active:
+                return self.session
+            self.active = False
+            self._stop_event.set()
+            for engine in self._engines:
+                event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+                event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+            self.session.finished_at = datetime.now(timezone.utc)
+            thread = self._thread
+
+        if thread is not threading.current_thread():
+            thread.join(timeout=1)
+        logger.info("🔬 Profiling finished", samples=self.session.samples,
+                    messages=self.session.messages_seen)
+        return self.session
+
+    def message_processed(self):
+        """Hook called by the consumer after each message"""
+        if not self.active:
+            return
+        with self._lock:
+            if not self.active:
+                return
+            session = self.session
+            session.messages_seen += 1
+            limit_reached = session.messages and session.messages_seen >= session.messages
+        if limit_reached:
+            self.stop()
+
+    def _sample_loop(self):
+        session = self.session
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(session.interval):
+            if session.deadline and time.monotonic() >= session.deadline:
+                self.stop()
+                return
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stack.reverse()
+                session.stacks[tuple(stack)] += 1
+            session.samples += 1
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        session = self.session
+        entry = conn.info.get(_QUERY_START_KEY)
+        if entry is None or entry[0] is not session:
+            # Starts left on a pooled connection by a session stopped mid-query are dropped
+            entry = conn.info[_QUERY_START_KEY] = (session, [])
+        entry[1].append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        session = self.session
+        entry = conn.info.get(_QUERY_START_KEY)
+        if entry is None or entry[0] is not session or not entry[1]:
+            # Query started before this session (or under a previous one)
+            conn.info.pop(_QUERY_START_KEY, None)
+            return
+        elapsed_ms = (time.perf_counter() - entry[1].pop()) * 1000
+
+        key = (_issuer(sys._getframe()), " ".join(statement.split())[:300])
+        stats = session.sql[key]
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+# Global profiler instance
+profiler = SamplingProfiler()
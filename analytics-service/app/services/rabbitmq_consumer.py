@@ -1,26 +1,97 @@
 import os
 import json
+import functools
 import pika
 import time
 import threading
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import structlog
 from colorama import init, Fore, Style
 from app.database.connection import db_manager
-from app.services.analytics_service import AnalyticsService
+from app.handlers import EventHandler, handler_registry
+from app.services.live_updates import live_updates
+from app.services.profiling import profiler
 
 # Initialize colorama for colored console output
 init(autoreset=True)
 
 logger = structlog.get_logger(__name__)
 
+# Adaptive prefetch: commit latency the consumer aims for, the query pool
+# saturation at which it backs off, and how often qos may change
+COMMIT_LATENCY_TARGET = float(os.getenv('ANALYTICS_COMMIT_LATENCY_TARGET_MS', 250)) / 1000
+QUERY_SATURATION_LIMIT = float(os.getenv('ANALYTICS_PREFETCH_QUERY_SATURATION', 0.9))
+PREFETCH_ADJUST_SECONDS = float(os.getenv('ANALYTICS_PREFETCH_ADJUST_SECONDS', 1.0))
+
+class AdaptivePrefetch:
+    """AIMD controller for one handler's channel prefetch.
+
+    Prefetch is halved (down to `batch_size`, so batches still fill) when the
+    API's query pool is nearly saturated or the smoothed commit latency exceeds
+    its target, and grows by one batch (up to `<env_prefix>_PREFETCH_MAX`)
+    while both are comfortably low. The ingest pool is not a useful signal: the
+    single consumer thread never waits on it. Messages the database cannot
+    absorb stay in the broker instead of piling up unacked in this process.
+    """
+    def __init__(self, handler: EventHandler):
+        self.floor = handler.batch_size
+        self.ceiling = max(int(os.getenv(f"{handler.env_prefix}_PREFETCH_MAX", handler.prefetch_count * 4)),
+                           handler.prefetch_count)
+        self.step = handler.batch_size
+        self.current = handler.prefetch_count
+        self.commit_latency: Optional[float] = None
+        self.query_saturation = 0.0
+        self._last_change = 0.0
+
+    def observe(self, commit_seconds: float, query_saturation: float) -> Optional[int]:
+        """Record a batch commit; returns the new prefetch when it should change"""
+        if self.commit_latency is None:
+            self.commit_latency = commit_seconds
+        else:
+            self.commit_latency = 0.7 * self.commit_latency + 0.3 * commit_seconds
+        self.query_saturation = query_saturation
+
+        now = time.monotonic()
+        if now - self._last_change < PREFETCH_ADJUST_SECONDS:
+            return None
+
+        if query_saturation >= QUERY_SATURATION_LIMIT or self.commit_latency > COMMIT_LATENCY_TARGET:
+            target = max(self.current // 2, self.floor)
+        elif query_saturation < QUERY_SATURATION_LIMIT / 2 and self.commit_latency < COMMIT_LATENCY_TARGET / 2:
+            target = min(self.current + self.step, self.ceiling)
+        else:
+            return None
+
+        if target == self.current:
+            return None
+        self.current = target
+        self._last_change = now
+        return target
+
+    def to_dict(self) -> Dict:
+        return {
+            "prefetch": self.current,
+            "min": self.floor,
+            "max": self.ceiling,
+            "commit_latency_ms": round(self.commit_latency * 1000, 2) if self.commit_latency is not None else None,
+            "query_pool_saturation": round(self.query_saturation, 3),
+        }
+
 class RabbitMQConsumer:
     def __init__(self):
         self.connection: Optional[pika.BlockingConnection] = None
-        self.channel: Optional[pika.channel.Channel] = None
-        self.queue_name = "analytics.user.registered"
+        self.channels: Dict[str, pika.adapters.blocking_connection.BlockingChannel] = {}
+        self.exchange_name = "user.events"
         self.processed_messages = 0
         self.is_consuming = False
+        # Decoded messages awaiting a batch commit, per event type
+        self._pending: Dict[str, List[Tuple[object, int, object]]] = {}
+        self._flush_timers: Dict[str, object] = {}
+        # Handler owning each channel; batches are settled per channel with `multiple`
+        self._channel_handlers: Dict[int, EventHandler] = {}
+        self.prefetch: Dict[str, AdaptivePrefetch] = {
+            handler.event_type: AdaptivePrefetch(handler) for handler in handler_registry
+        }
         
     def connect(self) -> bool:
         """Connect to RabbitMQ with retry logic"""
@@ -51,7 +122,6 @@ class RabbitMQConsumer:
                 print(f"{Fore.YELLOW}   VHOST: {parameters.virtual_host}")
                 
                 self.connection = pika.BlockingConnection(parameters)
-                self.channel = self.connection.channel()
                 
                 print(f"{Fore.GREEN}✅ Connected to RabbitMQ successfully!")
                 logger.info("Connected to RabbitMQ", attempt=attempt)
@@ -71,30 +141,60 @@ class RabbitMQConsumer:
         return False
     
     def setup_queues(self):
-        """Declare queues and exchanges"""
+        """Open one channel per handler and declare/bind its queue"""
         try:
-            # Declare the analytics queue
-            self.channel.queue_declare(
-                queue=self.queue_name,
-                durable=True
-            )
-            
-            print(f"{Fore.GREEN}📋 Queue '{self.queue_name}' is ready")
-            logger.info("Queue declared", queue=self.queue_name)
+            for handler in handler_registry:
+                channel = self.connection.channel()
+                
+                # Per-handler concurrency limit: unacked messages in flight (adapted as batches commit)
+                channel.basic_qos(prefetch_count=self.prefetch[handler.event_type].current)
+                
+                channel.exchange_declare(
+                    exchange=self.exchange_name,
+                    exchange_type='topic',
+                    durable=True
+                )
+                channel.queue_declare(
+                    queue=handler.queue_name,
+                    durable=True
+                )
+                channel.queue_bind(
+                    queue=handler.queue_name,
+                    exchange=self.exchange_name,
+                    routing_key=handler.routing_key
+                )
+                channel.basic_consume(
+                    queue=handler.queue_name,
+                    on_message_callback=functools.partial(self.process_message, handler=handler)
+                )
+                self.channels[handler.event_type] = channel
+                self._channel_handlers[id(channel)] = handler
+                
+                prefetch = self.prefetch[handler.event_type]
+                print(f"{Fore.GREEN}📋 Queue '{handler.queue_name}' is ready "
+                      f"(routing key: {handler.routing_key}, prefetch: {prefetch.current} "
+                      f"[{prefetch.floor}-{prefetch.ceiling}], batch: {handler.batch_size})")
+                logger.info("Queue declared", queue=handler.queue_name, routing_key=handler.routing_key,
+                            prefetch=prefetch.current, batch_size=handler.batch_size)
             
         except Exception as e:
             print(f"{Fore.RED}❌ Failed to setup queues: {e}")
             logger.error("Failed to setup queues", error=str(e))
             raise
     
-    def process_message(self, channel, method, properties, body):
-        """Process incoming RabbitMQ message"""
+    def process_message(self, channel, method, properties, body, handler: Optional[EventHandler] = None):
+        """Decode an incoming RabbitMQ message and hand it to the handler owning its channel.
+
+        Messages are routed by the channel (queue) they arrived on, never by the
+        body alone: `_settle` acks with `multiple=True`, which is only safe when
+        every unacked message on a channel belongs to the same handler.
+        """
         try:
             # Parse message
             message = json.loads(body)
             
             # Handle both "event" and "event_type" fields for compatibility
-            event_type = message.get('event_type') or message.get('event')
+            event_type = message.get('event_type') or message.get('event') or method.routing_key
             event_data = message.get('data', {})
             
             print(f"\n{Fore.CYAN}📨 Received event:")
@@ -102,48 +202,40 @@ class RabbitMQConsumer:
             print(f"{Fore.CYAN}   User: {event_data.get('name')} ({event_data.get('email')})")
             print(f"{Fore.CYAN}   Timestamp: {event_data.get('created_at')}")
             
-            # Process analytics
-            if event_type == 'user.registered':
-                db = db_manager.get_session()
-                try:
-                    analytics_service = AnalyticsService(db)
-                    success = analytics_service.process_user_registration(event_data)
-                    
-                    if success:
-                        self.processed_messages += 1
-                        
-                        print(f"\n{Fore.GREEN}📊 ANALYTICS PROCESSED")
-                        print(f"{Fore.GREEN}{'='*50}")
-                        print(f"{Fore.GREEN}🎯 User Analytics Updated!")
-                        print(f"{Fore.GREEN}┌─────────────────────────────────────┐")
-                        print(f"{Fore.GREEN}│ 👤 Name: {event_data.get('name'):<23} │")
-                        print(f"{Fore.GREEN}│ 📧 Email: {event_data.get('email'):<22} │")
-                        print(f"{Fore.GREEN}│ 🏷️  Domain: {event_data.get('email', '').split('@')[1] if '@' in event_data.get('email', '') else 'unknown':<21} │")
-                        print(f"{Fore.GREEN}│ 🆔 ID: {event_data.get('user_id'):<27} │")
-                        print(f"{Fore.GREEN}└─────────────────────────────────────┘")
-                        print(f"{Fore.GREEN}📈 Stored in analytics database")
-                        print(f"{Fore.GREEN}📊 Updated domain statistics")
-                        print(f"{Fore.GREEN}⏰ Updated hourly trends")
-                        print(f"{Fore.GREEN}📅 Updated daily aggregates")
-                        print(f"{Fore.GREEN}{'='*50}")
-                        print(f"{Fore.GREEN}✅ Message processed successfully! (Total: {self.processed_messages})")
-                        
-                        # Show summary every 5 messages
-                        if self.processed_messages % 5 == 0:
-                            self._show_analytics_summary(analytics_service)
-                        
-                        # Acknowledge message
-                        channel.basic_ack(delivery_tag=method.delivery_tag)
-                        
-                    else:
-                        print(f"{Fore.RED}❌ Failed to process analytics")
-                        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-                        
-                finally:
-                    db.close()
-            else:
-                print(f"{Fore.YELLOW}⚠️  Unknown event type: {event_type}")
-                channel.basic_ack(delivery_tag=method.delivery_tag)
+            handler = handler or self._channel_handlers.get(id(channel))
+            if handler is None:
+                # Channels not set up by `setup_queues` (benchmarks) are bound on first use
+                handler = handler_registry.get(event_type)
+                if handler is None:
+                    print(f"{Fore.YELLOW}⚠️  Unknown event type: {event_type}")
+                    channel.basic_ack(delivery_tag=method.delivery_tag)
+                    return
+                self._channel_handlers[id(channel)] = handler
+            
+            if event_type != handler.event_type and handler_registry.get(event_type) is not None:
+                # Another handler's event on this queue: reject it (dead-letters if configured)
+                print(f"{Fore.YELLOW}⚠️  {event_type} event on the {handler.queue_name} queue, rejecting")
+                logger.warning("Event type does not match queue", event_type=event_type, queue=handler.queue_name)
+                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                return
+            
+            event = handler.decode(message)
+            if event is None:
+                print(f"{Fore.RED}❌ Invalid {event_type} payload")
+                logger.error("Invalid event payload", event_type=event_type, data=event_data)
+                channel.basic_ack(delivery_tag=method.delivery_tag)  # Discard invalid message
+                return
+            
+            pending = self._pending.setdefault(handler.event_type, [])
+            pending.append((channel, method.delivery_tag, event))
+            
+            if len(pending) >= handler.batch_size:
+                self._flush(handler)
+            elif handler.event_type not in self._flush_timers and self.connection:
+                # Commit a partial batch once the handler's flush interval elapses
+                self._flush_timers[handler.event_type] = self.connection.call_later(
+                    handler.flush_interval, lambda: self._flush(handler)
+                )
                 
         except json.JSONDecodeError:
             print(f"{Fore.RED}❌ Invalid JSON message")
@@ -154,28 +246,96 @@ class RabbitMQConsumer:
             print(f"{Fore.RED}❌ Error processing message: {e}")
             logger.error("Error processing message", error=str(e))
             channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        
+        finally:
+            profiler.message_processed()
     
-    def _show_analytics_summary(self, analytics_service: AnalyticsService):
-        """Show analytics summary every few messages"""
+    def flush_all(self):
+        """Commit every partially filled batch"""
+        for handler in handler_registry:
+            self._flush(handler)
+    
+    def _flush(self, handler: EventHandler):
+        """Commit the handler's pending batch and settle its messages"""
+        timer = self._flush_timers.pop(handler.event_type, None)
+        if timer is not None and self.connection:
+            self.connection.remove_timeout(timer)
+        
+        pending = self._pending.pop(handler.event_type, None)
+        if not pending:
+            return
+        
+        db = db_manager.get_ingest_session()
         try:
-            stats = analytics_service.get_dashboard_stats()
+            events = [event for _, _, event in pending]
+            started = time.perf_counter()
+            if handler.process_batch(db, events):
+                self._adapt_prefetch(handler, time.perf_counter() - started)
+                self._settle(pending, ack=True)
+                self._on_committed(handler, db, events)
+                return
             
-            print(f"\n{Fore.MAGENTA}📊 ANALYTICS SUMMARY")
-            print(f"{Fore.MAGENTA}{'='*60}")
-            print(f"{Fore.MAGENTA}Total registrations processed: {stats.get('total_registrations', 0)}")
-            print(f"{Fore.MAGENTA}Unique email domains: {stats.get('unique_domains', 0)}")
-            print(f"{Fore.MAGENTA}Today's registrations: {stats.get('today_registrations', 0)}")
-            
-            top_domains = stats.get('top_domains', [])[:3]
-            if top_domains:
-                print(f"{Fore.MAGENTA}Top domains:")
-                for i, domain in enumerate(top_domains, 1):
-                    print(f"{Fore.MAGENTA}  {i}. {domain['domain']} ({domain['count']} users)")
-            
-            print(f"{Fore.MAGENTA}{'='*60}")
+            if len(pending) == 1:
+                print(f"{Fore.RED}❌ Failed to process {handler.event_type} event")
+                self._settle(pending, ack=False)
+                return
             
+            # Retry one by one so a single bad event does not requeue the whole batch
+            print(f"{Fore.YELLOW}⚠️  Batch of {len(pending)} {handler.event_type} events failed, retrying individually")
+            for item in pending:
+                if handler.process_batch(db, [item[2]]):
+                    self._settle([item], ack=True)
+                    self._on_committed(handler, db, [item[2]])
+                else:
+                    print(f"{Fore.RED}❌ Failed to process {handler.event_type} event")
+                    self._settle([item], ack=False)
+        
         except Exception as e:
-            logger.error("Failed to show analytics summary", error=str(e))
+            print(f"{Fore.RED}❌ Error processing {handler.event_type} batch: {e}")
+            logger.error("Error processing batch", event_type=handler.event_type, error=str(e))
+            self._settle(pending, ack=False)
+        
+        finally:
+            db.close()
+    
+    def _adapt_prefetch(self, handler: EventHandler, commit_seconds: float):
+        """Feed commit latency and query pool saturation to the handler's prefetch controller"""
+        prefetch = self.prefetch[handler.event_type].observe(commit_seconds, db_manager.pool_saturation("query"))
+        if prefetch is None:
+            return
+        
+        channel = self.channels.get(handler.event_type)
+        if channel is not None and channel.is_open:
+            channel.basic_qos(prefetch_count=prefetch)
+        logger.info("🚦 Prefetch adjusted", event_type=handler.event_type, **self.prefetch[handler.event_type].to_dict())
+    
+    def _settle(self, items: List[Tuple[object, int, object]], ack: bool):
+        """Ack (or nack with requeue) messages, one call per channel"""
+        last_tags: Dict[int, Tuple[object, int]] = {}
+        for channel, delivery_tag, _ in items:
+            known = last_tags.get(id(channel))
+            if known is None or delivery_tag > known[1]:
+                last_tags[id(channel)] = (channel, delivery_tag)
+        
+        # Each channel carries a single handler's queue and every unacked
+        # message on it is part of this batch, so `multiple` is safe
+        for channel, delivery_tag in last_tags.values():
+            if ack:
+                channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+            else:
+                channel.basic_nack(delivery_tag=delivery_tag, multiple=True, requeue=True)
+    
+    def _on_committed(self, handler: EventHandler, db, events: List):
+        """Bookkeeping and console output after a batch has been committed"""
+        handler.processed += len(events)
+        self.processed_messages += len(events)
+        
+        # Push the committed delta to live stream subscribers
+        if handler.last_update is not None:
+            live_updates.publish(handler.last_update)
+        
+        handler.report(db, events)
+        print(f"{Fore.GREEN}✅ {len(events)} {handler.event_type} message(s) processed successfully! (Total: {self.processed_messages})")
     
     def start_consuming(self):
         """Start consuming messages"""
@@ -185,22 +345,16 @@ class RabbitMQConsumer:
         try:
             self.setup_queues()
             
-            # Configure QoS
-            self.channel.basic_qos(prefetch_count=1)
-            
-            # Start consuming
-            self.channel.basic_consume(
-                queue=self.queue_name,
-                on_message_callback=self.process_message
-            )
-            
             self.is_consuming = True
             
-            print(f"\n{Fore.GREEN}🎯 Starting to consume from: {self.queue_name}")
+            queues = ", ".join(handler.queue_name for handler in handler_registry)
+            print(f"\n{Fore.GREEN}🎯 Starting to consume from: {queues}")
             print(f"{Fore.GREEN}👂 Waiting for analytics events... (Press Ctrl+C to exit)")
             print(f"{Fore.GREEN}{'='*60}\n")
             
-            self.channel.start_consuming()
+            # Dispatches callbacks and flush timers for all handler channels
+            while self.is_consuming:
+                self.connection.process_data_events(time_limit=1)
             
         except KeyboardInterrupt:
             print(f"\n{Fore.YELLOW}⏹️  Stopping consumer...")
@@ -210,14 +364,19 @@ class RabbitMQConsumer:
             print(f"{Fore.RED}❌ Error during consumption: {e}")
             logger.error("Error during consumption", error=str(e))
             return False
+        
+        finally:
+            if self.connection and self.connection.is_open:
+                # Commit (or requeue) held batches while their channels can still ack
+                self.flush_all()
+                self.connection.close()
     
     def stop_consuming(self):
-        """Stop consuming messages gracefully"""
+        """Stop consuming messages gracefully (safe to call from another thread)"""
         self.is_consuming = False
-        if self.channel:
-            self.channel.stop_consuming()
-        if self.connection:
-            self.connection.close()
+        if self.connection and self.connection.is_open:
+            # Wake the consumer loop so it exits, flushes pending batches and closes the connection itself
+            self.connection.add_callback_threadsafe(lambda: None)
         print(f"{Fore.YELLOW}🔒 RabbitMQ consumer stopped")
 
 # Global consumer instance
@@ -0,0 +1,479 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import (Column, DateTime, Index, MetaData, Table, case, create_engine, func, insert, inspect,
+                        select, text, type_coerce, update)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+import structlog
+from app.models.analytics import DailyAnalytics, DomainAnalytics, HourlyAnalytics, UserRegistrationEvent
+from app.services.watermark_service import sealed_hour_cache
+
+logger = structlog.get_logger(__name__)
+
+events_table = UserRegistrationEvent.__table__
+domain_table = DomainAnalytics.__table__
+hourly_table = HourlyAnalytics.__table__
+daily_table = DailyAnalytics.__table__
+
+# Worker processes and the width of each time-range chunk
+REBUILD_WORKERS = int(os.getenv('ANALYTICS_REBUILD_WORKERS', min(os.cpu_count() or 2, 4)))
+REBUILD_CHUNK_HOURS = int(os.getenv('ANALYTICS_REBUILD_CHUNK_HOURS', 24))
+
+AGGREGATE_TABLES = (domain_table, hourly_table, daily_table)
+
+# Rebuilt aggregates are written to `<table>_rebuild`; the swap renames the live table to `<table>_retired`
+STAGING_SUFFIX = "_rebuild"
+RETIRED_SUFFIX = "_retired"
+
+def _lock_timeout_ms() -> int:
+    value = os.getenv('ANALYTICS_REBUILD_LOCK_TIMEOUT_MS', '10000')
+    if not value.isdigit() or int(value) == 0:
+        raise ValueError(f"ANALYTICS_REBUILD_LOCK_TIMEOUT_MS must be a positive integer of milliseconds, got {value!r}")
+    return int(value)
+
+# Upper bound on waiting for in-flight ingest at the fence and for the swap's renames (Postgres only)
+REBUILD_LOCK_TIMEOUT_MS = _lock_timeout_ms()
+
+def _utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes; everything is stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _hour_bucket(connection: Connection):
+    """Dialect-specific truncation of registration_time to the hour"""
+    if connection.dialect.name == "postgresql":
+        return func.date_trunc("hour", events_table.c.registration_time)
+    return type_coerce(func.strftime("%Y-%m-%d %H:00:00", events_table.c.registration_time), DateTime)
+
+def aggregate_events(connection: Connection, where: List) -> Dict:
+    """Set-based aggregation of the events matching `where`: per-hour counts and per-domain stats"""
+    hour = _hour_bucket(connection).label("hour")
+    hours = {
+        _utc(bucket): count
+        for bucket, count in connection.execute(
+            select(hour, func.count()).where(*where).group_by(hour)
+        )
+    }
+
+    domains = {
+        domain: [count, _utc(first_seen), _utc(last_seen)]
+        for domain, count, first_seen, last_seen in connection.execute(
+            select(
+                events_table.c.email_domain,
+                func.count(),
+                func.min(events_table.c.registration_time),
+                func.max(events_table.c.registration_time)
+            ).where(*where).group_by(events_table.c.email_domain)
+        )
+    }
+
+    return {"rows": sum(hours.values()), "hours": hours, "domains": domains}
+
+def _aggregate_chunk(db_url: str, start: datetime, end: datetime, max_id: int) -> Dict:
+    """Process pool entry point: aggregate one [start, end) range of events up to max_id"""
+    connect_args = {"options": "-c timezone=UTC"} if db_url.startswith("postgresql") else {}
+    engine = create_engine(db_url, poolclass=NullPool, connect_args=connect_args)
+    try:
+        with engine.connect() as connection:
+            return aggregate_events(connection, [
+                events_table.c.registration_time >= start,
+                events_table.c.registration_time < end,
+                events_table.c.id <= max_id,
+            ])
+    finally:
+        engine.dispose()
+
+def _days(hours: Dict[datetime, int]) -> Dict[datetime, int]:
+    days: Dict[datetime, int] = {}
+    for hour, count in hours.items():
+        day = hour.replace(hour=0)
+        days[day] = days.get(day, 0) + count
+    return days
+
+def _table_copy(table: Table, name: str) -> Table:
+    """Columns, defaults and primary key of an aggregate table under another name (no indexes)"""
+    return Table(name, MetaData(), *(
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable,
+               default=column.default.arg if column.default is not None else None)
+        for column in table.columns
+    ))
+
+def _index_for(table: Table, reflected: Dict, name: str) -> Index:
+    """A reflected live index, recreated on `table` under `name`"""
+    return Index(name, *(table.c[column] for column in reflected["column_names"]), unique=bool(reflected["unique"]))
+
+def _merge(total: Dict, part: Dict):
+    total["rows"] += part["rows"]
+    for hour, count in part["hours"].items():
+        total["hours"][hour] = total["hours"].get(hour, 0) + count
+    for domain, (count, first_seen, last_seen) in part["domains"].items():
+        stats = total["domains"].get(domain)
+        if stats is None:
+            total["domains"][domain] = [count, first_seen, last_seen]
+        else:
+            stats[0] += count
+            stats[1] = min(stats[1], first_seen)
+            stats[2] = max(stats[2], last_seen)
+
+def _popularity(percentage: float) -> str:
+    return 'Popular' if percentage >= 10 else 'Common' if percentage >= 1 else 'Rare'
+
+class AggregateRebuilder:
+    """Recomputes domain, hourly and daily analytics from `user_registration_events`.
+
+    Events up to an id fence are aggregated set-based, one time-range chunk per
+    task, in a process pool, and written to staging tables; no locks are held
+    while that runs. A short swap transaction then folds in the events that
+    arrived after the fence and renames the staging tables into place, so
+    readers see either the old or the new aggregates and nothing is lost.
+    """
+    def __init__(self):
+        self.status: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.status is not None and self.status["state"] == "running"
+
+    def start(self, session_factory: Callable[[], Session], workers: Optional[int] = None,
+              chunk_hours: Optional[int] = None, dry_run: bool = False) -> bool:
+        """Run a rebuild in a background thread. Returns False if one is running."""
+        with self._lock:
+            if self.running:
+                return False
+            self._begin(workers, chunk_hours, dry_run)
+
+        def _run():
+            db = session_factory()
+            try:
+                self._rebuild(db)
+            finally:
+                db.close()
+
+        self._thread = threading.Thread(target=_run, name="aggregate-rebuild", daemon=True)
+        self._thread.start()
+        return True
+
+    def run(self, db: Session, workers: Optional[int] = None, chunk_hours: Optional[int] = None,
+            dry_run: bool = False) -> Dict:
+        """Run a rebuild in the calling thread and return the final status"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A rebuild is already running")
+            self._begin(workers, chunk_hours, dry_run)
+
+        self._rebuild(db)
+        return self.status
+
+    def _begin(self, workers: Optional[int], chunk_hours: Optional[int], dry_run: bool):
+        self.status = {
+            "state": "running",
+            "phase": "planning",
+            "dry_run": dry_run,
+            "workers": workers or REBUILD_WORKERS,
+            "chunk_hours": chunk_hours or REBUILD_CHUNK_HOURS,
+            "chunks_total": 0,
+            "chunks_done": 0,
+            "rows_scanned": 0,
+            "rows_per_second": 0.0,
+            "elapsed_seconds": 0.0,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "finished_at": None,
+            "error": None,
+        }
+
+    def _progress(self, started: float, **changes):
+        self.status.update(changes)
+        elapsed = time.perf_counter() - started
+        self.status["elapsed_seconds"] = round(elapsed, 2)
+        self.status["rows_per_second"] = round(self.status["rows_scanned"] / elapsed, 1) if elapsed else 0.0
+
+    def _rebuild(self, db: Session):
+        started = time.perf_counter()
+        try:
+            max_id = self._fence(db)
+            chunks = self._plan_chunks(db, max_id, self.status["chunk_hours"])
+            self._progress(started, phase="aggregating", max_event_id=max_id, chunks_total=len(chunks))
+            logger.info("🔁 Aggregate rebuild started", max_event_id=max_id, chunks=len(chunks),
+                        workers=self.status["workers"], dry_run=self.status["dry_run"])
+
+            result = self._aggregate_parallel(db, chunks, max_id, started)
+
+            if self.status["dry_run"]:
+                summary = self._dry_run(db, result, max_id)
+            else:
+                self._progress(started, phase="staging")
+                self._stage(db, result, _days(result["hours"]))
+                self._progress(started, phase="swapping")
+                summary = self._swap(db, result, max_id)
+            self._progress(started, state="completed", phase="done",
+                           finished_at=datetime.now(timezone.utc).isoformat(), **summary)
+            logger.info("✅ Aggregate rebuild finished", rows=self.status["rows_scanned"],
+                        rows_per_second=self.status["rows_per_second"],
+                        elapsed_seconds=self.status["elapsed_seconds"], dry_run=self.status["dry_run"])
+        except Exception as e:
+            db.rollback()
+            self._progress(started, state="failed", error=str(e),
+                           finished_at=datetime.now(timezone.utc).isoformat())
+            logger.error("❌ Aggregate rebuild failed", error=str(e))
+
+    def _fence(self, db: Session) -> int:
+        """Highest event id such that every event at or below it is committed.
+
+        No lock is taken. On Postgres an ingest transaction still in flight when
+        the id is read may hold a lower id, so this waits (up to the lock
+        timeout) until every transaction running at that point has finished.
+        SQLite has a single writer, so committed ids are always a contiguous prefix.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            max_id = db.execute(select(func.coalesce(func.max(events_table.c.id), 0))).scalar()
+            db.commit()
+            return max_id
+
+        max_id, fence_xmax = db.execute(
+            select(
+                func.coalesce(func.max(events_table.c.id), 0),
+                func.txid_snapshot_xmax(func.txid_current_snapshot())
+            )
+        ).one()
+        db.commit()
+
+        deadline = time.monotonic() + REBUILD_LOCK_TIMEOUT_MS / 1000
+        while db.execute(select(func.txid_snapshot_xmin(func.txid_current_snapshot()))).scalar() < fence_xmax:
+            db.commit()
+            if time.monotonic() > deadline:
+                raise TimeoutError("Ingest transactions in flight at the fence did not finish in time")
+            time.sleep(0.05)
+        db.commit()
+        return max_id
+
+    def _plan_chunks(self, db: Session, max_id: int, chunk_hours: int) -> List[Tuple[datetime, datetime]]:
+        """Hour-aligned [start, end) ranges covering every event up to max_id"""
+        first, last = db.execute(
+            select(func.min(events_table.c.registration_time), func.max(events_table.c.registration_time))
+            .where(events_table.c.id <= max_id)
+        ).one()
+        db.commit()
+        if first is None:
+            return []
+
+        start = _utc(first).replace(minute=0, second=0, microsecond=0)
+        last = _utc(last)
+        step = timedelta(hours=chunk_hours)
+        chunks = []
+        while start <= last:
+            chunks.append((start, start + step))
+            start += step
+        return chunks
+
+    def _aggregate_parallel(self, db: Session, chunks: List[Tuple[datetime, datetime]], max_id: int,
+                            started: float) -> Dict:
+        result = {"rows": 0, "hours": {}, "domains": {}}
+        if not chunks:
+            return result
+
+        db_url = db.get_bind().url.render_as_string(hide_password=False)
+        # Spawned workers do not inherit the consumer thread or pooled connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.status["workers"], mp_context=context) as pool:
+            futures = [pool.submit(_aggregate_chunk, db_url, start, end, max_id) for start, end in chunks]
+            for future in as_completed(futures):
+                part = future.result()
+                _merge(result, part)
+                self._progress(started, chunks_done=self.status["chunks_done"] + 1,
+                               rows_scanned=self.status["rows_scanned"] + part["rows"])
+                if self.status["chunks_done"] % 10 == 0 or self.status["chunks_done"] == len(chunks):
+                    logger.info("🔁 Rebuild progress", chunks_done=self.status["chunks_done"],
+                                chunks_total=len(chunks), rows=self.status["rows_scanned"],
+                                rows_per_second=self.status["rows_per_second"])
+        return result
+
+    def _stage(self, db: Session, result: Dict, days: Dict[datetime, int]):
+        """Write the rebuilt aggregates into empty staging tables, outside any lock"""
+        connection = db.connection()
+        postgresql = connection.dialect.name == "postgresql"
+        indexes = inspect(connection)
+        now = datetime.now(timezone.utc)
+        total = result["rows"] or 1
+
+        for table in AGGREGATE_TABLES:
+            staging = _table_copy(table, f"{table.name}{STAGING_SUFFIX}")
+            staging.drop(connection, checkfirst=True)
+            staging.create(connection)
+
+            rows = {
+                "domain_analytics": [
+                    {
+                        "domain": domain,
+                        "total_registrations": count,
+                        "first_seen": first_seen,
+                        "last_seen": last_seen,
+                        "percentage_of_total": count * 100.0 / total,
+                        "is_popular": _popularity(count * 100.0 / total),
+                        "updated_at": now
+                    }
+                    for domain, (count, first_seen, last_seen) in result["domains"].items()
+                ],
+                "hourly_analytics": [
+                    {"hour_start": hour, "registrations_count": count, "created_at": now}
+                    for hour, count in sorted(result["hours"].items())
+                ],
+                "daily_analytics": [
+                    {"date": day, "total_registrations": count, "created_at": now, "updated_at": now}
+                    for day, count in sorted(days.items())
+                ],
+            }[table.name]
+            if rows:
+                db.execute(insert(staging), rows)
+
+            if postgresql:
+                # Built after the load; renamed to the live names by the swap
+                for index in indexes.get_indexes(table.name):
+                    _index_for(staging, index, f"{index['name']}{STAGING_SUFFIX}").create(connection)
+
+        db.commit()
+
+    def _apply_tail(self, db: Session, result: Dict, tail: Dict, days: Dict[datetime, int]):
+        """Fold the post-fence events into the staging tables (counts in `result` already include them)"""
+        hourly = _table_copy(hourly_table, f"{hourly_table.name}{STAGING_SUFFIX}")
+        daily = _table_copy(daily_table, f"{daily_table.name}{STAGING_SUFFIX}")
+        domains = _table_copy(domain_table, f"{domain_table.name}{STAGING_SUFFIX}")
+        now = datetime.now(timezone.utc)
+
+        for hour in tail["hours"]:
+            count = result["hours"][hour]
+            updated = db.execute(update(hourly).where(hourly.c.hour_start == hour).values(registrations_count=count))
+            if updated.rowcount == 0:
+                db.execute(insert(hourly).values(hour_start=hour, registrations_count=count, created_at=now))
+
+        for day in {hour.replace(hour=0) for hour in tail["hours"]}:
+            updated = db.execute(update(daily).where(daily.c.date == day)
+                                 .values(total_registrations=days[day], updated_at=now))
+            if updated.rowcount == 0:
+                db.execute(insert(daily).values(date=day, total_registrations=days[day], created_at=now, updated_at=now))
+
+        for domain in tail["domains"]:
+            count, first_seen, last_seen = result["domains"][domain]
+            updated = db.execute(update(domains).where(domains.c.domain == domain)
+                                 .values(total_registrations=count, first_seen=first_seen, last_seen=last_seen))
+            if updated.rowcount == 0:
+                db.execute(insert(domains).values(domain=domain, total_registrations=count,
+                                                  first_seen=first_seen, last_seen=last_seen))
+
+        # The tail moves every domain's share of the total
+        percentage = domains.c.total_registrations * 100.0 / (result["rows"] or 1)
+        db.execute(update(domains).values(
+            percentage_of_total=percentage,
+            is_popular=case((percentage >= 10, 'Popular'), (percentage >= 1, 'Common'), else_='Rare'),
+            updated_at=now
+        ))
+
+    def _swap(self, db: Session, result: Dict, max_id: int) -> Dict:
+        """Fold post-fence events into the staging tables and rename them into place.
+
+        The swap transaction renames the live tables out of the way first. That
+        waits for ingest transactions already writing aggregates (so their
+        events are in the tail) and holds back new ones until commit; those
+        then resolve the table names again and write to the rebuilt tables.
+        Only the tail, a few renames and index renames run while it is held.
+        """
+        connection = db.connection()
+        postgresql = connection.dialect.name == "postgresql"
+        if postgresql:
+            db.execute(select(func.set_config('lock_timeout', str(REBUILD_LOCK_TIMEOUT_MS), True)))
+
+        live_indexes = {table.name: inspect(connection).get_indexes(table.name) for table in AGGREGATE_TABLES}
+        # Same order the ingest path writes them in, so the two cannot deadlock
+        for table in AGGREGATE_TABLES:
+            db.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}{RETIRED_SUFFIX}"))
+
+        tail = aggregate_events(connection, [events_table.c.id > max_id])
+        _merge(result, tail)
+        days = _days(result["hours"])
+        drift = self._drift(db, result, days, suffix=RETIRED_SUFFIX)
+        self._apply_tail(db, result, tail, days)
+
+        for table in AGGREGATE_TABLES:
+            db.execute(text(f"ALTER TABLE {table.name}{STAGING_SUFFIX} RENAME TO {table.name}"))
+            if postgresql:
+                # The retired table owns the live sequence; the rebuilt one brings its own
+                db.execute(text(f"DROP TABLE {table.name}{RETIRED_SUFFIX}"))
+                db.execute(text(f"ALTER SEQUENCE {table.name}{STAGING_SUFFIX}_id_seq RENAME TO {table.name}_id_seq"))
+                db.execute(text(f"ALTER TABLE {table.name} RENAME CONSTRAINT "
+                                f"{table.name}{STAGING_SUFFIX}_pkey TO {table.name}_pkey"))
+                for index in live_indexes[table.name]:
+                    db.execute(text(f"ALTER INDEX {index['name']}{STAGING_SUFFIX} RENAME TO {index['name']}"))
+            else:
+                # SQLite cannot rename indexes; aggregate tables are small enough to index here
+                db.execute(text(f"DROP TABLE {table.name}{RETIRED_SUFFIX}"))
+                live = _table_copy(table, table.name)
+                for index in live_indexes[table.name]:
+                    _index_for(live, index, index["name"]).create(connection)
+
+        db.commit()
+
+        # Rebuilt counts replace whatever sealed hours were cached
+        sealed_hour_cache.clear()
+        return self._summary(result, tail, days, drift)
+
+    def _dry_run(self, db: Session, result: Dict, max_id: int) -> Dict:
+        """Drift of the live tables against the rebuilt aggregates, without staging or swapping"""
+        connection = db.connection()
+        if connection.dialect.name == "postgresql":
+            # Tail and live aggregates from one snapshot
+            db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+
+        tail = aggregate_events(connection, [events_table.c.id > max_id])
+        _merge(result, tail)
+        days = _days(result["hours"])
+        drift = self._drift(db, result, days)
+        db.commit()
+        return self._summary(result, tail, days, drift)
+
+    def _summary(self, result: Dict, tail: Dict, days: Dict[datetime, int], drift: Dict) -> Dict:
+        return {
+            "rows_scanned": self.status["rows_scanned"] + tail["rows"],
+            "tail_rows": tail["rows"],
+            "domains": len(result["domains"]),
+            "hours": len(result["hours"]),
+            "days": len(days),
+            "drift": drift,
+        }
+
+    def _drift(self, db: Session, result: Dict, days: Dict[datetime, int], suffix: str = "") -> Dict:
+        """How far the live aggregates (renamed with `suffix` during a swap) are from the rebuilt ones"""
+        domains, hourly, daily = (_table_copy(table, f"{table.name}{suffix}") for table in AGGREGATE_TABLES)
+
+        def _diff(rebuilt: Dict, current: Dict) -> Dict:
+            keys = set(rebuilt) | set(current)
+            changed = [key for key in keys if rebuilt.get(key, 0) != current.get(key, 0)]
+            return {
+                "rows_changed": len(changed),
+                "count_delta": sum(rebuilt.values()) - sum(current.values()),
+            }
+
+        return {
+            "domains": _diff(
+                {domain: stats[0] for domain, stats in result["domains"].items()},
+                dict(db.execute(select(domains.c.domain, domains.c.total_registrations)).all())
+            ),
+            "hourly": _diff(
+                result["hours"],
+                {_utc(hour): count for hour, count in db.execute(
+                    select(hourly.c.hour_start, hourly.c.registrations_count)).all()}
+            ),
+            "daily": _diff(
+                days,
+                {_utc(day): count for day, count in db.execute(
+                    select(daily.c.date, daily.c.total_registrations)).all()}
+            ),
+        }
+
+# Global rebuilder (one rebuild at a time per process)
+rebuilder = AggregateRebuilder()
@@ -0,0 +1,370 @@
+import bisect
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+import structlog
+from app.models.analytics import BucketWatermark, HourlyAnalytics
+from app.models.events import RegistrationEvent
+
+logger = structlog.get_logger(__name__)
+
+watermark_table = BucketWatermark.__table__
+hourly_table = HourlyAnalytics.__table__
+
+# How far behind the newest event time a bucket may still receive events
+ALLOWED_LATENESS = timedelta(seconds=int(os.getenv('ANALYTICS_WATERMARK_LATENESS_SECONDS', 300)))
+
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+class LagHistogram:
+    """Cumulative histogram of end-to-end lag (processed_at - registration_time), in seconds"""
+    BOUNDS = [0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600, 6 * 3600, 24 * 3600]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BOUNDS) + 1)
+        self._sum = 0.0
+        self._max = 0.0
+
+    def observe_many(self, lags: Iterable[float]):
+        with self._lock:
+            for lag in lags:
+                lag = max(lag, 0.0)
+                self._counts[bisect.bisect_left(self.BOUNDS, lag)] += 1
+                self._sum += lag
+                self._max = max(self._max, lag)
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile"""
+        rank = q * total
+        running = 0
+        for index, count in enumerate(counts):
+            running += count
+            if running >= rank:
+                return self.BOUNDS[index] if index < len(self.BOUNDS) else self._max
+        return None
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = sum(counts)
+            lag_sum, lag_max = self._sum, self._max
+
+        buckets, running = [], 0
+        for bound, count in zip(self.BOUNDS + [None], counts):
+            running += count
+            buckets.append({"le": bound if bound is not None else "+Inf", "count": running})
+
+        return {
+            "count": total,
+            "sum_seconds": round(lag_sum, 3),
+            "mean_seconds": round(lag_sum / total, 3) if total else None,
+            "max_seconds": round(lag_max, 3),
+            "p50_seconds": self._quantile(counts, total, 0.50) if total else None,
+            "p95_seconds": self._quantile(counts, total, 0.95) if total else None,
+            "p99_seconds": self._quantile(counts, total, 0.99) if total else None,
+            "buckets": buckets,
+        }
+
+class SealedBucketCache:
+    """Hourly counts for sealed buckets, held until a bucket is reopened.
+
+    `covered` is a contiguous [start, end) range for which every hourly row is
+    cached (hours without a row simply have no registrations). Reopening a
+    bucket clips the range so it is re-read once sealed again. Invalidation is
+    in-process, which matches the consumer thread living in the API process.
+    Every invalidation bumps a generation; rows fetched across a bump are
+    returned to that caller but never cached.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[datetime, int] = {}
+        self._covered: Optional[Tuple[datetime, datetime]] = None
+        self._generation = 0
+
+    def read(self, db: Session, start: datetime, end: datetime) -> Dict[datetime, int]:
+        """Sealed hourly counts in [start, end), querying only the uncovered edges"""
+        with self._lock:
+            covered = self._covered
+            generation = self._generation
+
+        gaps = []
+        if covered is None or covered[1] < start or covered[0] > end:
+            gaps.append((start, end))
+            new_covered = (start, end)
+        else:
+            if start < covered[0]:
+                gaps.append((start, covered[0]))
+            if covered[1] < end:
+                gaps.append((covered[1], end))
+            new_covered = (min(start, covered[0]), max(end, covered[1]))
+
+        fetched = {}
+        for gap_start, gap_end in gaps:
+            rows = db.execute(
+                select(hourly_table.c.hour_start, hourly_table.c.registrations_count)
+                .where(hourly_table.c.hour_start >= gap_start)
+                .where(hourly_table.c.hour_start < gap_end)
+            ).all()
+            fetched.update({self._key(hour): count for hour, count in rows})
+
+        with self._lock:
+            # A bucket reopened while we were reading may be stale in `fetched`
+            if self._generation == generation:
+                self._counts.update(fetched)
+                self._covered = new_covered
+            counts = {hour: count for hour, count in self._counts.items() if start <= hour < end}
+        counts.update({hour: count for hour, count in fetched.items() if start <= hour < end})
+        return counts
+
+    def invalidate(self, hours: Iterable[datetime]):
+        hours = list(hours)
+        if not hours:
+            return
+        with self._lock:
+            self._generation += 1
+            for hour in hours:
+                hour = self._key(hour)
+                self._counts.pop(hour, None)
+                if self._covered and self._covered[0] <= hour < self._covered[1]:
+                    self._covered = (self._covered[0], hour) if hour > self._covered[0] else None
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._counts.clear()
+            self._covered = None
+
+    @staticmethod
+    def _key(hour: datetime) -> datetime:
+        # SQLite returns naive datetimes; buckets are always UTC
+        return hour if hour.tzinfo else hour.replace(tzinfo=timezone.utc)
+
+class NewestEventTime:
+    """Newest registration time committed by this process, read from the table on first use.
+
+    Like the sealed-hour cache it assumes the consumer lives in this process;
+    the ingest path advances it after each commit.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value: Optional[datetime] = None
+        self._loaded = False
+
+    def get(self, db: Session) -> Optional[datetime]:
+        with self._lock:
+            if self._loaded:
+                return self._value
+
+        newest = db.execute(
+            select(func.max(watermark_table.c.max_event_time))
+            .where(watermark_table.c.granularity == "hour")
+        ).scalar()
+
+        with self._lock:
+            if not self._loaded:
+                self._value = SealedBucketCache._key(newest) if newest is not None else None
+                self._loaded = True
+            return self._value
+
+    def advance(self, value: datetime):
+        with self._lock:
+            # Until loaded, the table already holds anything committed
+            if self._loaded and (self._value is None or value > self._value):
+                self._value = value
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+def _hour_floor(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+class WatermarkService:
+    """Tracks per-bucket event-time watermarks and seals buckets that are final.
+
+    The watermark is the newest event time seen minus ALLOWED_LATENESS. Once it
+    passes a bucket's end the bucket is sealed. An event that still lands in a
+    sealed bucket is counted as late, bumps the bucket's revision and reopens
+    it until the next sealing pass.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    def observe_registrations(self, events: List[RegistrationEvent], processed_at: datetime) -> Set[datetime]:
+        """Record a batch's event times (inside the caller's transaction). Returns reopened hours.
+
+        The watermark comes from the batch and the process's cached newest event
+        time, and every bucket the batch touches is written with one upsert.
+        Other buckets are sealed only when the watermark crosses an hour.
+        """
+        buckets: Dict[Tuple[str, datetime], List] = {}
+        for event in events:
+            for granularity, bucket_start in (("hour", event.hour_start), ("day", event.day)):
+                stats = buckets.get((granularity, bucket_start))
+                if stats is None:
+                    buckets[(granularity, bucket_start)] = [1, event.registration_time]
+                else:
+                    stats[0] += 1
+                    stats[1] = max(stats[1], event.registration_time)
+
+        previous_newest = newest_event_time.get(self.db)
+        newest = max(max_time for _, max_time in buckets.values())
+        if previous_newest is not None:
+            newest = max(newest, previous_newest)
+        watermark = newest - ALLOWED_LATENESS
+
+        rows = []
+        for (granularity, bucket_start), (count, max_time) in buckets.items():
+            bucket_end = bucket_start + GRANULARITIES[granularity]
+            sealed = bucket_end <= watermark
+            rows.append({
+                "granularity": granularity,
+                "bucket_start": bucket_start,
+                "bucket_end": bucket_end,
+                "event_count": count,
+                "max_event_time": max_time,
+                "last_processed_at": processed_at,
+                "late_events": 0,
+                "revision": 0,
+                "sealed": sealed,
+                "sealed_at": processed_at if sealed else None,
+            })
+
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(watermark_table).values(rows)
+        new = statement.excluded
+        # SET expressions see the existing row: events landing in a sealed bucket are late
+        was_sealed = watermark_table.c.sealed.is_(True)
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=[watermark_table.c.granularity, watermark_table.c.bucket_start],
+            set_={
+                "event_count": watermark_table.c.event_count + new.event_count,
+                "max_event_time": case(
+                    (watermark_table.c.max_event_time < new.max_event_time, new.max_event_time),
+                    else_=watermark_table.c.max_event_time
+                ),
+                "last_processed_at": new.last_processed_at,
+                "late_events": watermark_table.c.late_events + case((was_sealed, new.event_count), else_=0),
+                "revision": watermark_table.c.revision + case((was_sealed, 1), else_=0),
+                "sealed": new.sealed,
+                "sealed_at": new.sealed_at,
+            }
+        ))
+
+        # Buckets the previous watermark had already passed; their cached counts are stale
+        previous_watermark = previous_newest - ALLOWED_LATENESS if previous_newest is not None else None
+        late = {
+            (granularity, bucket_start) for granularity, bucket_start in buckets
+            if previous_watermark is not None and bucket_start + GRANULARITIES[granularity] <= previous_watermark
+        }
+        if late:
+            logger.warning("⏪ Late events landed in sealed buckets",
+                           buckets=[f"{g}:{b.isoformat()}" for g, b in sorted(late)])
+
+        if previous_watermark is None or _hour_floor(watermark) > _hour_floor(previous_watermark):
+            self.seal(processed_at, watermark)
+        return {bucket_start for granularity, bucket_start in late if granularity == "hour"}
+
+    def current_watermark(self) -> Optional[datetime]:
+        newest = self.db.execute(
+            select(func.max(watermark_table.c.max_event_time))
+            .where(watermark_table.c.granularity == "hour")
+        ).scalar()
+        if newest is None:
+            return None
+        return SealedBucketCache._key(newest) - ALLOWED_LATENESS
+
+    def seal(self, now: Optional[datetime] = None, watermark: Optional[datetime] = None) -> int:
+        """Seal every open bucket whose end the watermark (read from the table by default) has passed"""
+        if watermark is None:
+            watermark = self.current_watermark()
+        if watermark is None:
+            return 0
+
+        result = self.db.execute(
+            update(watermark_table)
+            .where(watermark_table.c.sealed.is_(False))
+            .where(watermark_table.c.bucket_end <= watermark)
+            .values(sealed=True, sealed_at=now or datetime.now(timezone.utc))
+        )
+        return result.rowcount
+
+    def sealed_through(self, granularity: str = "hour") -> Optional[datetime]:
+        """Start of the first bucket that is not sealed; every earlier bucket is final"""
+        first_open, newest = self.db.execute(
+            select(
+                func.min(case((watermark_table.c.sealed.is_(False), watermark_table.c.bucket_start))),
+                func.max(watermark_table.c.max_event_time)
+            ).where(watermark_table.c.granularity == granularity)
+        ).one()
+
+        if newest is None:
+            return None
+
+        # Buckets without events up to the watermark are sealed (and empty)
+        watermark = SealedBucketCache._key(newest) - ALLOWED_LATENESS
+        size = GRANULARITIES[granularity]
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        through = epoch + ((watermark - epoch) // size) * size
+        if first_open is not None:
+            through = min(through, SealedBucketCache._key(first_open))
+        return through
+
+    def get_status(self, open_limit: int = 48) -> Dict:
+        """Watermark, open buckets and late-event totals"""
+        watermark = self.current_watermark()
+
+        open_buckets = self.db.execute(
+            select(
+                watermark_table.c.granularity,
+                watermark_table.c.bucket_start,
+                watermark_table.c.event_count,
+                watermark_table.c.max_event_time,
+                watermark_table.c.revision
+            )
+            .where(watermark_table.c.sealed.is_(False))
+            .order_by(watermark_table.c.bucket_start.desc())
+            .limit(open_limit)
+        ).all()
+
+        late_events, reopened_buckets = self.db.execute(
+            select(
+                func.coalesce(func.sum(watermark_table.c.late_events), 0),
+                func.count().filter(watermark_table.c.revision > 0)
+            ).where(watermark_table.c.granularity == "hour")
+        ).one()
+
+        return {
+            "watermark": watermark.isoformat() if watermark else None,
+            "allowed_lateness_seconds": ALLOWED_LATENESS.total_seconds(),
+            "sealed_through": {
+                granularity: (through.isoformat() if through else None)
+                for granularity, through in ((g, self.sealed_through(g)) for g in GRANULARITIES)
+            },
+            "late_events": int(late_events),
+            "reopened_hour_buckets": int(reopened_buckets),
+            "open_buckets": [
+                {
+                    "granularity": granularity,
+                    "bucket_start": SealedBucketCache._key(bucket_start).isoformat(),
+                    "events": count,
+                    "max_event_time": SealedBucketCache._key(max_time).isoformat(),
+                    "revision": revision
+                }
+                for granularity, bucket_start, count, max_time, revision in open_buckets
+            ],
+        }
+
+# Process-wide lag histogram, sealed hourly bucket cache and newest event time
+lag_histogram = LagHistogram()
+sealed_hour_cache = SealedBucketCache()
+newest_event_time = NewestEventTime()
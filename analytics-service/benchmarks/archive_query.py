@@ -0,0 +1,150 @@
+"""Benchmark of long-range history queries: row store vs. Parquet + DuckDB.
+
+Loads synthetic registrations spread over --days into the database given by
+--db-url (a temporary SQLite file by default), archives them to Parquet, then
+times the same questions against both engines:
+
+- domain_mix: top domains over the full range and over the last 30 days
+- daily: registrations and distinct domains per day over the full range
+
+    python -m benchmarks.archive_query --events 200000 --days 365 --db-url postgresql://...
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from typing import Callable, Dict
+
+from benchmarks.generator import RegistrationEventGenerator
+from benchmarks.results import build_report, write_report
+
+def _time(fn: Callable, repeats: int) -> Dict:
+    samples = []
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+        "rows": len(result),
+    }
+
+def run(args) -> Dict:
+    # Read by DatabaseManager / the archive services on first use
+    os.environ["DATABASE_URL"] = args.db_url
+    os.environ["ANALYTICS_ARCHIVE_DIR"] = args.archive_dir
+
+    from sqlalchemy import func, select
+    from app.database.connection import db_manager
+    from app.models.analytics import UserRegistrationEvent
+    from app.models.events import decode_registration
+    from app.services.analytics_service import AnalyticsService
+    from app.services.archive_service import ParquetArchiver
+    from app.services.history_service import HistoryQueryService
+
+    db_manager.run_migrations()
+    db = db_manager.get_session()
+    generator = RegistrationEventGenerator(seed=args.seed, days=args.days)
+
+    t0 = time.perf_counter()
+    batch = []
+    for event in generator.events(args.events):
+        batch.append(decode_registration(event["data"]))
+        if len(batch) == 5000:
+            AnalyticsService(db).process_registration_batch(batch)
+            batch = []
+    if batch:
+        AnalyticsService(db).process_registration_batch(batch)
+    load_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    archive = ParquetArchiver(db, root=args.archive_dir).run()
+    archive_seconds = time.perf_counter() - t0
+
+    start = generator.start.date()
+    end = start + timedelta(days=args.days - 1)
+    recent = end - timedelta(days=29)
+    events = UserRegistrationEvent.__table__
+    history = HistoryQueryService(root=args.archive_dir)
+
+    def row_store_domain_mix(first, last):
+        query = (
+            select(events.c.email_domain, func.count().label("registrations"))
+            .where(events.c.registration_time >= generator.start + timedelta(days=(first - start).days))
+            .where(events.c.registration_time < generator.start + timedelta(days=(last - start).days + 1))
+            .group_by(events.c.email_domain)
+            .order_by(func.count().desc())
+            .limit(10)
+        )
+        return db.execute(query).all()
+
+    def row_store_daily():
+        day = func.date(events.c.registration_time)
+        query = (
+            select(day, func.count(), func.count(events.c.email_domain.distinct()))
+            .group_by(day)
+            .order_by(day)
+        )
+        return db.execute(query).all()
+
+    queries = {
+        "domain_mix_full_range": (
+            lambda: row_store_domain_mix(start, end),
+            lambda: history.get_domain_mix(start, end),
+        ),
+        "domain_mix_last_30_days": (
+            lambda: row_store_domain_mix(recent, end),
+            lambda: history.get_domain_mix(recent, end),
+        ),
+        "daily_full_range": (
+            row_store_daily,
+            lambda: history.get_daily_registrations(start, end),
+        ),
+    }
+
+    results = {
+        "load_seconds": round(load_seconds, 2),
+        "archive_seconds": round(archive_seconds, 2),
+        "rows_archived": archive["rows_archived"],
+        "partitions": archive["days_archived"],
+        "queries": {},
+    }
+    for name, (row_store, parquet) in queries.items():
+        results["queries"][name] = {
+            "row_store": _time(row_store, args.repeats),
+            "parquet_duckdb": _time(parquet, args.repeats),
+        }
+
+    db.close()
+    db_manager.close()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--db-url", default=None,
+                        help="SQLAlchemy URL of an empty database (default: fresh SQLite file in a temp dir)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        args.archive_dir = os.path.join(tmp, "archive")
+        if args.db_url is None:
+            args.db_url = f"sqlite:///{os.path.join(tmp, 'analytics_bench.db')}"
+
+        config = {key: value for key, value in vars(args).items() if key not in ("output", "archive_dir")}
+        report = build_report("archive_query", config, run(args))
+
+    write_report(report, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+class FakeChannel:
+    """Minimal stand-in for a pika channel that records acknowledgements"""
+    def __init__(self):
+        self.acked = 0
+        self.nacked = 0
+        self.requeued = 0
+        self._delivery_tag = 0
+        self._unsettled = set()
+
+    def next_delivery(self, routing_key: str = "user.registered"):
+        """Return (method, properties) for the next simulated delivery"""
+        self._delivery_tag += 1
+        self._unsettled.add(self._delivery_tag)
+        method = SimpleNamespace(
+            delivery_tag=self._delivery_tag,
+            routing_key=routing_key,
+            exchange="user.events",
+            redelivered=False,
+        )
+        properties = SimpleNamespace(content_type="application/json", headers={})
+        return method, properties
+
+    def _settle(self, delivery_tag: int, multiple: bool) -> int:
+        if multiple:
+            tags = {tag for tag in self._unsettled if tag <= delivery_tag}
+        else:
+            tags = {delivery_tag} & self._unsettled
+        self._unsettled -= tags
+        return len(tags)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self.acked += self._settle(delivery_tag, multiple)
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        settled = self._settle(delivery_tag, multiple)
+        self.nacked += settled
+        if requeue:
+            self.requeued += settled
@@ -0,0 +1,96 @@
+import bisect
+import itertools
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List
+
+# Head of the domain distribution; the long tail is filled with synthetic company domains
+COMMON_DOMAINS = [
+    "gmail.com", "outlook.com", "yahoo.com", "hotmail.com", "icloud.com",
+    "proton.me", "aol.com", "live.com", "gmx.de", "mail.ru",
+]
+
+FIRST_NAMES = ["Ahmed", "Sara", "John", "Mona", "Omar", "Lina", "David", "Nour", "Maria", "Youssef"]
+LAST_NAMES = ["Hassan", "Smith", "Ali", "Garcia", "Mostafa", "Brown", "Ibrahim", "Khan", "Lopez", "Adel"]
+
+def diurnal_weights(peak_hour: int = 15, amplitude: float = 0.8) -> List[float]:
+    """Relative registration rate for each UTC hour (sinusoid peaking at peak_hour)"""
+    return [
+        1.0 + amplitude * math.cos(2 * math.pi * (hour - peak_hour) / 24)
+        for hour in range(24)
+    ]
+
+class RegistrationEventGenerator:
+    """Seedable generator of realistic `user.registered` messages.
+
+    Domains follow a Zipf distribution (rank k has weight 1/k^s) and timestamps
+    follow a diurnal curve spread over `days` starting at `start`. The same seed
+    always yields the same message sequence.
+    """
+    def __init__(self, seed: int = 42, domain_count: int = 500, zipf_s: float = 1.1,
+                 start: datetime = None, days: int = 7, peak_hour: int = 15):
+        self.seed = seed
+        self.domain_count = domain_count
+        self.zipf_s = zipf_s
+        self.start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.days = days
+        self.peak_hour = peak_hour
+
+        self.domains = (COMMON_DOMAINS + [
+            f"company{n}.com" for n in range(1, max(domain_count - len(COMMON_DOMAINS), 0) + 1)
+        ])[:domain_count]
+        self._domain_cum_weights = list(itertools.accumulate(
+            1.0 / (rank ** zipf_s) for rank in range(1, len(self.domains) + 1)
+        ))
+        self._hour_cum_weights = list(itertools.accumulate(diurnal_weights(peak_hour)))
+
+    def config(self) -> Dict:
+        return {
+            "seed": self.seed,
+            "domain_count": self.domain_count,
+            "zipf_s": self.zipf_s,
+            "start": self.start.isoformat(),
+            "days": self.days,
+            "peak_hour": self.peak_hour,
+        }
+
+    def _timestamps(self, rng: random.Random, count: int) -> List[datetime]:
+        timestamps = []
+        hour_total = self._hour_cum_weights[-1]
+        for _ in range(count):
+            day = rng.randrange(self.days)
+            hour = bisect.bisect(self._hour_cum_weights, rng.random() * hour_total)
+            offset = timedelta(days=day, hours=hour, seconds=rng.randrange(3600))
+            timestamps.append(self.start + offset)
+        # Registrations arrive in (roughly) event-time order
+        timestamps.sort()
+        return timestamps
+
+    def events(self, count: int) -> Iterator[Dict]:
+        """Yield `count` event payloads in the shape published by user-service"""
+        rng = random.Random(self.seed)
+        domains = rng.choices(self.domains, cum_weights=self._domain_cum_weights, k=count)
+
+        for user_id, (domain, created_at) in enumerate(zip(domains, self._timestamps(rng, count)), 1):
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            # Laravel's toISOString() format
+            created = created_at.strftime('%Y-%m-%dT%H:%M:%S.000000Z')
+            yield {
+                "event": "user.registered",
+                "data": {
+                    "user_id": user_id,
+                    "name": f"{first} {last}",
+                    "email": f"{first.lower()}.{last.lower()}{user_id}@{domain}",
+                    "created_at": created,
+                },
+                "timestamp": created,
+                "service": "user-service",
+            }
+
+    def messages(self, count: int) -> Iterator[bytes]:
+        """Yield `count` encoded message bodies"""
+        for event in self.events(count):
+            yield json.dumps(event).encode()
@@ -0,0 +1,98 @@
+"""Memory and allocation benchmark for the consumer's event representation.
+
+Uses tracemalloc to compare, per 100k events, what each representation of a
+decoded `user.registered` message costs:
+
+- dict: the raw `data` dict from json.loads (baseline the decoder starts from)
+- registration_event: the slotted RegistrationEvent value type
+- orm_instance: a UserRegistrationEvent ORM instance (the previous hot path)
+
+For each, `retained` is the memory held by 100k live objects and `peak` the
+high-water mark while building them, i.e. including transient allocations.
+
+    python -m benchmarks.memory --events 100000 --output memory.json
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from benchmarks.generator import RegistrationEventGenerator
+from benchmarks.results import build_report, write_report
+
+def _measure(build: Callable[[bytes], object], bodies: List[bytes]) -> Dict:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    blocks_before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+
+    kept = [build(body) for body in bodies]
+
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks_after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+
+    count = len(kept)
+    del kept
+    gc.collect()
+
+    return {
+        "events": count,
+        "retained_bytes": retained - before,
+        "retained_bytes_per_event": round((retained - before) / count, 1),
+        "peak_bytes": peak - before,
+        "live_blocks_per_event": round((blocks_after - blocks_before) / count, 2),
+    }
+
+def _scale(result: Dict, per: int) -> Dict:
+    factor = per / result["events"]
+    return {
+        "retained_mb": round(result["retained_bytes"] * factor / 1e6, 2),
+        "peak_mb": round(result["peak_bytes"] * factor / 1e6, 2),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    from app.models.analytics import UserRegistrationEvent
+    from app.models.events import decode_registration, extract_email_domain
+
+    def build_dict(body: bytes):
+        return json.loads(body)["data"]
+
+    def build_registration_event(body: bytes):
+        return decode_registration(json.loads(body)["data"])
+
+    def build_orm_instance(body: bytes):
+        data = json.loads(body)["data"]
+        return UserRegistrationEvent(
+            user_id=data["user_id"],
+            name=data["name"],
+            email=data["email"],
+            email_domain=extract_email_domain(data["email"]),
+            registration_time=datetime.fromisoformat(data["created_at"].replace('Z', '+00:00'))
+        )
+
+    bodies = list(RegistrationEventGenerator(seed=args.seed).messages(args.events))
+
+    results = {}
+    for name, build in (("dict", build_dict),
+                        ("registration_event", build_registration_event),
+                        ("orm_instance", build_orm_instance)):
+        measured = _measure(build, bodies)
+        measured["per_100k"] = _scale(measured, 100000)
+        results[name] = measured
+
+    config = {"events": args.events, "seed": args.seed}
+    write_report(build_report("memory", config, results), args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
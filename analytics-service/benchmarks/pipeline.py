@@ -0,0 +1,198 @@
+"""End-to-end benchmark of the analytics ingest pipeline.
+
+Drives `RabbitMQConsumer.process_message` with synthetic `user.registered`
+messages (committed in batches per the handler's ANALYTICS_REGISTRATION_BATCH_SIZE), either through a fake pika channel or a local RabbitMQ broker,
+against the database given by --db-url (a temporary SQLite file by default).
+
+    python -m benchmarks.pipeline --events 5000 --output results.json
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.fake_channel import FakeChannel
+from benchmarks.generator import RegistrationEventGenerator
+from benchmarks.results import build_report, latency_summary, write_report
+
+class StatementCounter:
+    """Counts SQL statements, commits and time spent in the DB driver"""
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = 0
+        self.commits = 0
+        self.db_time = 0.0
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "commit", self._commit)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["bench_query_start"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        self.db_time += time.perf_counter() - conn.info.pop("bench_query_start")
+
+    def _commit(self, conn):
+        self.commits += 1
+
+def _deliveries_fake(bodies: List[bytes]):
+    channel = FakeChannel()
+    for body in bodies:
+        method, properties = channel.next_delivery()
+        yield channel, method, properties, body
+
+def _deliveries_rabbitmq(bodies: List[bytes], queue: str, timings: Dict):
+    """Publish all bodies to a dedicated queue, then fetch them one by one"""
+    import pika
+
+    credentials = pika.PlainCredentials(
+        username=os.getenv('RABBITMQ_USERNAME', 'admin'),
+        password=os.getenv('RABBITMQ_PASSWORD', 'password')
+    )
+    connection = pika.BlockingConnection(pika.ConnectionParameters(
+        host=os.getenv('RABBITMQ_HOST', 'localhost'),
+        port=int(os.getenv('RABBITMQ_PORT', 5672)),
+        virtual_host=os.getenv('RABBITMQ_VHOST', '/'),
+        credentials=credentials,
+    ))
+    channel = connection.channel()
+    # A private queue on the default exchange keeps benchmark traffic away
+    # from the other services bound to `user.events`
+    channel.queue_declare(queue=queue, durable=False, auto_delete=True)
+    channel.queue_purge(queue=queue)
+
+    started = time.perf_counter()
+    for body in bodies:
+        channel.basic_publish(exchange="", routing_key=queue, body=body,
+                              properties=pika.BasicProperties(content_type="application/json"))
+    timings["publish_seconds"] = time.perf_counter() - started
+
+    try:
+        for _ in range(len(bodies)):
+            method, properties, body = channel.basic_get(queue=queue)
+            while method is None:
+                time.sleep(0.001)
+                method, properties, body = channel.basic_get(queue=queue)
+            yield channel, method, properties, body
+    finally:
+        connection.close()
+
+def run(args) -> Dict:
+    # Read by DatabaseManager when the engine is first created
+    os.environ["DATABASE_URL"] = args.db_url
+
+    from app.database.connection import db_manager
+    from app.services.rabbitmq_consumer import RabbitMQConsumer
+
+    db_manager.run_migrations()
+
+    generator = RegistrationEventGenerator(seed=args.seed, domain_count=args.domains,
+                                           zipf_s=args.zipf, days=args.days)
+    bodies = list(generator.messages(args.warmup + args.events))
+    consumer = RabbitMQConsumer()
+    counter = StatementCounter(db_manager.ingest_engine)
+    timings: Dict = {}
+
+    if args.rabbitmq:
+        deliveries = _deliveries_rabbitmq(bodies, args.queue, timings)
+    else:
+        deliveries = _deliveries_fake(bodies)
+
+    handler_latency: List[float] = []
+    db_latency: List[float] = []
+    python_latency: List[float] = []
+    statements = commits = 0
+    started = None
+
+    # The consumer prints a banner per message; keep it out of the measurement
+    with contextlib.redirect_stdout(io.StringIO()) as sink:
+        # islice stops without resuming the generator, so the broker connection
+        # stays open until the final flush has acked its messages
+        for index, (channel, method, properties, body) in enumerate(itertools.islice(deliveries, len(bodies))):
+            if index == args.warmup:
+                statements, commits = counter.statements, counter.commits
+                started = time.perf_counter()
+
+            db_before = counter.db_time
+            t0 = time.perf_counter()
+            consumer.process_message(channel, method, properties, body)
+            elapsed = time.perf_counter() - t0
+            sink.seek(0)
+            sink.truncate()
+
+            if index < args.warmup:
+                continue
+
+            db_elapsed = counter.db_time - db_before
+            handler_latency.append(elapsed)
+            db_latency.append(db_elapsed)
+            python_latency.append(elapsed - db_elapsed)
+
+        # Commit whatever is left in partially filled batches
+        t0 = time.perf_counter()
+        try:
+            consumer.flush_all()
+        finally:
+            deliveries.close()
+        handler_latency[-1] += time.perf_counter() - t0
+
+    wall = time.perf_counter() - started if started is not None else 0.0
+    failed = len(bodies) - consumer.processed_messages
+    measured = len(handler_latency)
+    statements = counter.statements - statements
+    commits = counter.commits - commits
+
+    results = {
+        "events": measured,
+        "failed": failed,
+        "wall_seconds": round(wall, 4),
+        "events_per_sec": round(measured / wall, 2) if wall else None,
+        "statements_per_event": round(statements / measured, 3) if measured else None,
+        "commits_per_event": round(commits / measured, 3) if measured else None,
+        "latency": {
+            "handler": latency_summary(handler_latency),
+            "db": latency_summary(db_latency),
+            "python": latency_summary(python_latency),
+        },
+    }
+    if "publish_seconds" in timings:
+        results["publish_seconds"] = round(timings["publish_seconds"], 4)
+
+    db_manager.close()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000, help="Measured events")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured warm-up events")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--domains", type=int, default=500, help="Distinct email domains")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of the domain distribution")
+    parser.add_argument("--days", type=int, default=7, help="Days spanned by registration timestamps")
+    parser.add_argument("--db-url", default=None,
+                        help="SQLAlchemy URL (default: fresh SQLite file in a temp dir)")
+    parser.add_argument("--rabbitmq", action="store_true",
+                        help="Route messages through the local RabbitMQ broker instead of a fake channel")
+    parser.add_argument("--queue", default="analytics.benchmark", help="Queue used with --rabbitmq")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db_url is None:
+            args.db_url = f"sqlite:///{os.path.join(tmp, 'analytics_bench.db')}"
+
+        config = {key: value for key, value in vars(args).items() if key != "output"}
+        report = build_report("pipeline", config, run(args))
+
+    write_report(report, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
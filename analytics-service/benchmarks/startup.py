@@ -0,0 +1,111 @@
+"""Import-time and startup-time benchmark for the analytics service.
+
+Each measurement runs in a fresh interpreter so module caches do not hide
+import costs. Startup time is the time from process start until the FastAPI
+lifespan reaches `yield` (schema migration included, RabbitMQ excluded since
+the consumer connects in the background).
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from benchmarks.results import build_report, write_report
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import app.main
+print(json.dumps({"import_seconds": time.perf_counter() - t0}))
+"""
+
+STARTUP_SNIPPET = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import app.main as main
+t1 = time.perf_counter()
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+print(json.dumps({"import_seconds": t1 - t0, "startup_seconds": ready - t0}))
+"""
+
+def _run_snippet(snippet: str, env: Dict) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=SERVICE_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # The app logs to stdout as well; the measurement is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+def _top_imports(env: Dict, limit: int) -> List[Dict]:
+    """Slowest modules (cumulative) according to `python -X importtime`"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=SERVICE_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stderr
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+
+    modules.sort(key=lambda module: module["cumulative_ms"], reverse=True)
+    return modules[:limit]
+
+def _summary(samples: List[float]) -> Dict:
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to report")
+    parser.add_argument("--db-url", default=None,
+                        help="SQLAlchemy URL for the startup run (default: fresh SQLite file per run)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    imports: List[float] = []
+    startups: List[float] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        # Unreachable broker: the consumer thread retries in the background
+        env.setdefault("RABBITMQ_HOST", "127.0.0.1")
+        env.setdefault("RABBITMQ_PORT", "1")
+
+        for run in range(args.runs):
+            imports.append(_run_snippet(IMPORT_SNIPPET, env)["import_seconds"])
+
+            run_env = dict(env, DATABASE_URL=args.db_url or f"sqlite:///{os.path.join(tmp, f'startup_{run}.db')}")
+            startups.append(_run_snippet(STARTUP_SNIPPET, run_env)["startup_seconds"])
+
+        results = {
+            "import_app_main": _summary(imports),
+            "startup_to_ready": _summary(startups),
+            "slowest_imports": _top_imports(env, args.top),
+        }
+
+    config = {"runs": args.runs, "db_url": args.db_url or "sqlite (per run)"}
+    write_report(build_report("startup", config, results), args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
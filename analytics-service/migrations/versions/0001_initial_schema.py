@@ -0,0 +1,91 @@
+"""Initial analytics schema
+
+Revision ID: 0001_initial
+Revises:
+Create Date: 2025-06-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_registration_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('email_domain', sa.String(length=100), nullable=False),
+        sa.Column('registration_time', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_user_registration_events_id', 'user_registration_events', ['id'])
+    op.create_index('ix_user_registration_events_user_id', 'user_registration_events', ['user_id'])
+    op.create_index('ix_user_registration_events_email', 'user_registration_events', ['email'])
+    op.create_index('ix_user_registration_events_email_domain', 'user_registration_events', ['email_domain'])
+    op.create_index('ix_user_registration_events_registration_time', 'user_registration_events', ['registration_time'])
+    op.create_index('idx_registration_time', 'user_registration_events', ['registration_time'])
+    op.create_index('idx_email_domain_time', 'user_registration_events', ['email_domain', 'registration_time'])
+
+    op.create_table(
+        'daily_analytics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('total_registrations', sa.Integer(), nullable=False),
+        sa.Column('unique_domains', sa.Integer(), nullable=False),
+        sa.Column('top_domain', sa.String(length=100), nullable=True),
+        sa.Column('top_domain_count', sa.Integer(), nullable=True),
+        sa.Column('average_per_hour', sa.Float(), nullable=True),
+        sa.Column('peak_hour', sa.Integer(), nullable=True),
+        sa.Column('peak_hour_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_daily_analytics_id', 'daily_analytics', ['id'])
+    op.create_index('ix_daily_analytics_date', 'daily_analytics', ['date'], unique=True)
+
+    op.create_table(
+        'hourly_analytics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hour_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('registrations_count', sa.Integer(), nullable=False),
+        sa.Column('unique_domains_count', sa.Integer(), nullable=True),
+        sa.Column('top_domains', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_hourly_analytics_id', 'hourly_analytics', ['id'])
+    op.create_index('ix_hourly_analytics_hour_start', 'hourly_analytics', ['hour_start'])
+    op.create_index('idx_hour_start', 'hourly_analytics', ['hour_start'])
+
+    op.create_table(
+        'domain_analytics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('domain', sa.String(length=100), nullable=False),
+        sa.Column('total_registrations', sa.Integer(), nullable=False),
+        sa.Column('first_seen', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_seen', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('percentage_of_total', sa.Float(), nullable=True),
+        sa.Column('is_popular', sa.String(length=10), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_domain_analytics_id', 'domain_analytics', ['id'])
+    op.create_index('ix_domain_analytics_domain', 'domain_analytics', ['domain'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table('domain_analytics')
+    op.drop_table('hourly_analytics')
+    op.drop_table('daily_analytics')
+    op.drop_table('user_registration_events')
@@ -0,0 +1,50 @@
+"""Wallet deposit analytics tables
+
+Revision ID: 0002_wallet_deposits
+Revises: 0001_initial
+Create Date: 2025-06-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_wallet_deposits'
+down_revision = '0001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'wallet_deposit_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('amount', sa.Numeric(12, 2), nullable=False),
+        sa.Column('wallet_balance', sa.Numeric(14, 2), nullable=True),
+        sa.Column('deposit_time', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_wallet_deposit_events_id', 'wallet_deposit_events', ['id'])
+    op.create_index('ix_wallet_deposit_events_user_id', 'wallet_deposit_events', ['user_id'])
+    op.create_index('ix_wallet_deposit_events_deposit_time', 'wallet_deposit_events', ['deposit_time'])
+
+    op.create_table(
+        'hourly_deposit_analytics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hour_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('deposits_count', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(14, 2), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_hourly_deposit_analytics_id', 'hourly_deposit_analytics', ['id'])
+    op.create_index('ix_hourly_deposit_analytics_hour_start', 'hourly_deposit_analytics', ['hour_start'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table('hourly_deposit_analytics')
+    op.drop_table('wallet_deposit_events')
@@ -0,0 +1,41 @@
+"""Bucket watermarks for late and out-of-order events
+
+Revision ID: 0003_bucket_watermarks
+Revises: 0002_wallet_deposits
+Create Date: 2025-06-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_bucket_watermarks'
+down_revision = '0002_wallet_deposits'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'bucket_watermarks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('bucket_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.Column('max_event_time', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_processed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('late_events', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('sealed', sa.Boolean(), nullable=False),
+        sa.Column('sealed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('granularity', 'bucket_start', name='uq_bucket_watermark'),
+    )
+    op.create_index('ix_bucket_watermarks_id', 'bucket_watermarks', ['id'])
+    op.create_index('idx_bucket_watermark_open', 'bucket_watermarks', ['granularity', 'sealed', 'bucket_start'])
+
+
+def downgrade() -> None:
+    op.drop_table('bucket_watermarks')
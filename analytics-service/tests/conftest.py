@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+import pytest
+
+# DatabaseManager reads DATABASE_URL when its engines are first created
+_DB_DIR = tempfile.mkdtemp(prefix="analytics-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'analytics_test.db')}"
+
+from app.database.connection import db_manager  # noqa: E402
+from app.models.analytics import Base  # noqa: E402
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    db_manager.run_migrations()
+    yield
+    db_manager.close()
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    """Every test starts from empty tables and empty watermark caches"""
+    from app.services.watermark_service import newest_event_time, sealed_hour_cache
+
+    with db_manager.ingest_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    sealed_hour_cache.clear()
+    newest_event_time.clear()
+    yield
+
+@pytest.fixture
+def db():
+    session = db_manager.get_ingest_session()
+    yield session
+    session.close()
+
+def registration_message(user_id: int, created_at: str, email: str = None, event: str = "user.registered") -> bytes:
+    """Encoded message body as published by user-service"""
+    import json
+
+    return json.dumps({
+        "event": event,
+        "data": {
+            "user_id": user_id,
+            "name": f"User {user_id}",
+            "email": email or f"user{user_id}@example.com",
+            "created_at": created_at,
+        },
+        "timestamp": created_at,
+    }).encode()
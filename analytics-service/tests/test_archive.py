@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.events import decode_registration
+from app.services import history_service
+from app.services.analytics_service import AnalyticsService
+from app.services.archive_service import ParquetArchiver, _utc_day, read_manifest
+from app.services.history_service import HistoryQueryService, default_range
+
+def _ingest(db, first_user_id: int, count: int, day: date):
+    start = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc) + timedelta(hours=9)
+    events = [
+        decode_registration({
+            "user_id": first_user_id + offset,
+            "name": "User",
+            "email": f"user{first_user_id + offset}@example.com",
+            "created_at": (start + timedelta(minutes=offset)).isoformat(),
+        })
+        for offset in range(count)
+    ]
+    assert AnalyticsService(db).process_registration_batch(events)
+
+def test_backlog_for_an_archived_day_is_exported_again(db, tmp_path):
+    day = datetime.now(timezone.utc).date() - timedelta(days=3)
+    _ingest(db, 1, 5, day)
+
+    archiver = ParquetArchiver(db, root=str(tmp_path))
+    assert archiver.run()["days"] == {day.isoformat(): 5}
+    assert archiver.pending_days() == []
+
+    # The consumer catches up on a backlog for a day that was already archived
+    _ingest(db, 100, 3, day)
+    assert archiver.pending_days() == [day]
+    assert archiver.run()["days"] == {day.isoformat(): 8}
+    assert read_manifest(str(tmp_path), day)["rows"] == 8
+
+    history = HistoryQueryService(root=str(tmp_path)).get_daily_registrations(day, day)
+    assert history[0]["registrations"] == 8
+
+def test_pending_days_group_by_utc_day_on_postgres():
+    sql = str(select(_utc_day("postgresql")).compile(dialect=postgresql.dialect()))
+    assert "date(timezone(%(timezone_1)s, user_registration_events.registration_time))" in sql
+
+def test_late_event_before_utc_midnight_reopens_its_own_day(db, tmp_path):
+    day = datetime.now(timezone.utc).date() - timedelta(days=3)
+    _ingest(db, 1, 2, day)
+    archiver = ParquetArchiver(db, root=str(tmp_path))
+    archiver.run()
+
+    # 23:30 UTC is already the next day east of UTC; it still belongs to `day`
+    late = datetime.combine(day, datetime.min.time(), tzinfo=timezone(timedelta(hours=2))) + timedelta(hours=25, minutes=30)
+    assert AnalyticsService(db).process_registration_batch([decode_registration({
+        "user_id": 50, "name": "User", "email": "user50@example.com", "created_at": late.isoformat(),
+    })])
+    assert archiver.pending_days() == [day]
+
+def test_default_range_ends_yesterday_in_utc(monkeypatch):
+    class _Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            # Already the 2nd in UTC while local clocks west of UTC still say the 1st
+            return datetime(2025, 3, 2, 1, 0, tzinfo=timezone.utc).astimezone(tz)
+
+    monkeypatch.setattr(history_service, "datetime", _Clock)
+    assert default_range(7) == (date(2025, 2, 23), date(2025, 3, 1))
@@ -0,0 +1,54 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.api import dependencies
+from app.database.connection import POOL_SETTINGS, db_manager
+from app.handlers import handler_registry
+from app.services import rabbitmq_consumer
+from app.services.rabbitmq_consumer import QUERY_SATURATION_LIMIT, RabbitMQConsumer
+
+class _ExhaustedSession:
+    closed = False
+
+    def connection(self):
+        raise PoolTimeoutError("QueuePool limit reached")
+
+    def close(self):
+        self.closed = True
+
+def test_exhausted_query_pool_sheds_with_retry_after(monkeypatch):
+    session = _ExhaustedSession()
+    monkeypatch.setattr(dependencies.db_manager, "get_session", lambda: session)
+    monkeypatch.setitem(dependencies.admission, "shed_requests", 0)
+
+    with pytest.raises(HTTPException) as excinfo:
+        next(dependencies.get_db())
+
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers["Retry-After"] == str(dependencies.QUERY_RETRY_AFTER_SECONDS)
+    assert dependencies.admission["shed_requests"] == 1
+    assert session.closed
+
+def test_saturated_query_pool_lowers_prefetch(monkeypatch):
+    monkeypatch.setattr(rabbitmq_consumer, "PREFETCH_ADJUST_SECONDS", 0.0)
+    consumer = RabbitMQConsumer()
+    registration = handler_registry.get("user.registered")
+    prefetch = consumer.prefetch["user.registered"]
+    start = prefetch.current
+
+    # Dashboard load holding nearly every query connection: back off despite fast commits
+    settings = POOL_SETTINGS["query"]
+    held = [db_manager.engine.connect()
+            for _ in range(int((settings["pool_size"] + settings["max_overflow"]) * QUERY_SATURATION_LIMIT) + 1)]
+    try:
+        consumer._adapt_prefetch(registration, 0.001)
+        assert prefetch.current == max(start // 2, prefetch.floor) < start
+        assert prefetch.to_dict()["query_pool_saturation"] >= QUERY_SATURATION_LIMIT
+    finally:
+        for connection in held:
+            connection.close()
+
+    # Pool released: grow back one batch at a time
+    consumer._adapt_prefetch(registration, 0.001)
+    assert prefetch.current == max(start // 2, prefetch.floor) + prefetch.step
@@ -0,0 +1,25 @@
+import json
+
+from benchmarks import pipeline
+from benchmarks.generator import RegistrationEventGenerator
+
+def test_generator_is_deterministic_per_seed():
+    first = list(RegistrationEventGenerator(seed=7, domain_count=50).messages(200))
+    assert first == list(RegistrationEventGenerator(seed=7, domain_count=50).messages(200))
+    assert first != list(RegistrationEventGenerator(seed=8, domain_count=50).messages(200))
+
+    # Zipf head: the most common domain outnumbers the tail
+    domains = [json.loads(body)["data"]["email"].split("@")[1] for body in first]
+    assert domains.count("gmail.com") > domains.count("company40.com")
+
+def test_pipeline_benchmark_processes_every_event(tmp_path, monkeypatch):
+    # run() points DATABASE_URL at its own database; keep the change local to this test
+    monkeypatch.setenv("DATABASE_URL", "unused")
+    output = tmp_path / "results.json"
+
+    assert pipeline.main(["--events", "60", "--warmup", "5", "--domains", "20", "--output", str(output)]) == 0
+
+    results = json.loads(output.read_text())["results"]
+    assert results["events"] == 60
+    assert results["failed"] == 0
+    assert results["commits_per_event"] < 1
@@ -0,0 +1,112 @@
+from sqlalchemy import func, select
+
+from app.models.analytics import HourlyAnalytics, UserRegistrationEvent
+from app.services.analytics_service import AnalyticsService
+from app.services.rabbitmq_consumer import RabbitMQConsumer
+from benchmarks.fake_channel import FakeChannel
+from conftest import registration_message
+
+def _deliver(consumer: RabbitMQConsumer, channel: FakeChannel, body: bytes, routing_key: str = "user.registered"):
+    method, properties = channel.next_delivery(routing_key)
+    consumer.process_message(channel, method, properties, body)
+
+def _count(db, column) -> int:
+    return db.execute(select(func.coalesce(func.sum(column), 0))).scalar()
+
+def test_batch_is_committed_with_one_multiple_ack(db):
+    consumer = RabbitMQConsumer()
+    channel = FakeChannel()
+    for user_id in range(1, 4):
+        _deliver(consumer, channel, registration_message(user_id, "2025-01-01T10:00:00Z"))
+
+    assert channel.acked == 0
+    consumer.flush_all()
+
+    assert channel.acked == 3
+    assert db.execute(select(func.count()).select_from(UserRegistrationEvent)).scalar() == 3
+    assert _count(db, HourlyAnalytics.registrations_count) == 3
+
+def test_failed_batch_is_retried_one_by_one(db, monkeypatch):
+    store = AnalyticsService._store_registration_events
+
+    def failing_store(self, events, processed_at):
+        if any(event.user_id == 2 for event in events):
+            raise RuntimeError("constraint violation")
+        return store(self, events, processed_at)
+
+    monkeypatch.setattr(AnalyticsService, "_store_registration_events", failing_store)
+
+    consumer = RabbitMQConsumer()
+    channel = FakeChannel()
+    for user_id in range(1, 4):
+        _deliver(consumer, channel, registration_message(user_id, "2025-01-01T10:00:00Z"))
+    consumer.flush_all()
+
+    # The good events commit, only the bad one goes back to the queue
+    assert channel.acked == 2
+    assert channel.nacked == 1 and channel.requeued == 1
+    stored = db.execute(select(UserRegistrationEvent.user_id).order_by(UserRegistrationEvent.user_id)).scalars().all()
+    assert stored == [1, 3]
+    assert _count(db, HourlyAnalytics.registrations_count) == 2
+
+def test_messages_are_routed_by_channel_not_body(db):
+    consumer = RabbitMQConsumer()
+    registrations = FakeChannel()
+    _deliver(consumer, registrations, registration_message(1, "2025-01-01T10:00:00Z"))
+    _deliver(consumer, registrations, registration_message(2, "2025-01-01T10:05:00Z"))
+
+    # A deposit body on the registration queue must not settle the pending registrations
+    _deliver(consumer, registrations, registration_message(3, "2025-01-01T10:06:00Z", event="user.wallet.deposit"))
+    assert registrations.acked == 0
+    assert registrations.nacked == 1 and registrations.requeued == 0
+
+    consumer.flush_all()
+    assert registrations.acked == 2
+    assert db.execute(select(func.count()).select_from(UserRegistrationEvent)).scalar() == 2
+
+class _FakeConnection:
+    """Just enough of pika.BlockingConnection to drive `start_consuming` once"""
+    def __init__(self, channel: FakeChannel, on_events):
+        self.is_open = True
+        self.acked_at_close = None
+        self._channel = channel
+        self._on_events = on_events
+
+    def process_data_events(self, time_limit=None):
+        self._on_events()
+
+    def call_later(self, delay, callback):
+        return object()
+
+    def remove_timeout(self, timer):
+        pass
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+    def close(self):
+        self.acked_at_close = self._channel.acked
+        self.is_open = False
+
+def test_shutdown_commits_held_batches_before_closing(db, monkeypatch):
+    consumer = RabbitMQConsumer()
+    channel = FakeChannel()
+
+    def deliver_then_stop():
+        for user_id in range(1, 3):
+            _deliver(consumer, channel, registration_message(user_id, "2025-01-01T10:00:00Z"))
+        consumer.stop_consuming()
+
+    connection = _FakeConnection(channel, deliver_then_stop)
+
+    def connect():
+        consumer.connection = connection
+        return True
+
+    monkeypatch.setattr(consumer, "connect", connect)
+    monkeypatch.setattr(consumer, "setup_queues", lambda: None)
+    consumer.start_consuming()
+
+    # The partial batch was committed and acked, not left to be redelivered
+    assert connection.acked_at_close == 2
+    assert db.execute(select(func.count()).select_from(UserRegistrationEvent)).scalar() == 2
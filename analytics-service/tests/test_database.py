@@ -0,0 +1,41 @@
+from sqlalchemy import inspect, text
+
+from app.database.connection import DatabaseManager
+from app.models.analytics import Base
+
+def _head_revision() -> str:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    from app.database.connection import ALEMBIC_INI
+
+    return ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+
+def test_manager_does_not_connect_until_first_use(tmp_path, monkeypatch):
+    # Any connection attempt to this database would fail
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'missing' / 'analytics.db'}")
+    manager = DatabaseManager()
+    assert not manager.is_initialized
+
+    # Building engines and sessions must not open a connection either
+    manager.get_session().close()
+    assert manager.is_initialized
+    manager.close()
+
+def test_pre_alembic_database_is_stamped_then_upgraded(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'legacy.db'}")
+    manager = DatabaseManager()
+    try:
+        # Schema as the old import-time create_all left it: tables but no alembic_version
+        with manager.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                if table.name in ("user_registration_events", "daily_analytics", "hourly_analytics", "domain_analytics"):
+                    table.create(connection)
+
+        manager.run_migrations()
+
+        with manager.engine.connect() as connection:
+            assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == _head_revision()
+            assert "bucket_watermarks" in inspect(connection).get_table_names()
+    finally:
+        manager.close()
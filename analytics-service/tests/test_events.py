@@ -0,0 +1,13 @@
+import pytest
+
+from app.models.events import decode_registration
+
+@pytest.mark.parametrize("created_at, hour, day", [
+    ("2025-01-02T01:30:00+02:00", "2025-01-01T23:00:00+00:00", "2025-01-01T00:00:00+00:00"),
+    ("2025-01-02T10:10:00+05:30", "2025-01-02T04:00:00+00:00", "2025-01-02T00:00:00+00:00"),
+    ("2025-01-02T10:10:00", "2025-01-02T10:00:00+00:00", "2025-01-02T00:00:00+00:00"),
+])
+def test_registration_buckets_are_utc(created_at, hour, day):
+    event = decode_registration({"user_id": 1, "name": "A", "email": "a@example.com", "created_at": created_at})
+    assert event.hour_start.isoformat() == hour
+    assert event.day.isoformat() == day
@@ -0,0 +1,16 @@
+import pytest
+
+from app.handlers import EventHandler, HandlerRegistry
+
+def test_incomplete_handler_fails_at_registration():
+    registry = HandlerRegistry()
+
+    with pytest.raises(TypeError):
+        @registry.register
+        class DecodeOnly(EventHandler):
+            event_type = "user.decode_only"
+
+            def decode(self, message):
+                return message
+
+    assert len(registry) == 0
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+from app.services.live_updates import LiveUpdateHub
+
+def _delta(new_registrations: int, domains: dict, hour: str):
+    return {
+        "new_registrations": new_registrations,
+        "domains": domains,
+        "current_hour": {"hour_start": hour, "registrations": new_registrations},
+    }
+
+def test_deltas_published_from_another_thread_are_coalesced_per_subscriber():
+    hub = LiveUpdateHub()
+
+    async def scenario():
+        subscriber = hub.subscribe()
+
+        def consumer_thread():
+            hub.publish(_delta(2, {"gmail.com": 2}, "2025-01-01T10:00:00+00:00"))
+            hub.publish(_delta(1, {"gmail.com": 1, "proton.me": 1}, "2025-01-01T11:00:00+00:00"))
+
+        thread = threading.Thread(target=consumer_thread)
+        thread.start()
+        thread.join()
+
+        await asyncio.wait_for(subscriber.event.wait(), timeout=1)
+        update = hub.take(subscriber)
+        hub.unsubscribe(subscriber)
+        return update
+
+    update = asyncio.run(scenario())
+
+    # A slow client gets one merged update, never a queue
+    assert update["new_registrations"] == 3
+    assert update["domains"] == {"gmail.com": 3, "proton.me": 1}
+    assert update["current_hour"]["hour_start"] == "2025-01-01T11:00:00+00:00"
+    assert update["coalesced"] == 1
+    assert hub.subscriber_count == 0
+
+def test_full_hub_rejects_new_subscribers():
+    hub = LiveUpdateHub()
+    hub.max_subscribers = 1
+
+    async def scenario():
+        first = hub.subscribe()
+        return first, hub.subscribe()
+
+    first, second = asyncio.run(scenario())
+    assert first is not None and second is None
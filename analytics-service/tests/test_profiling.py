@@ -0,0 +1,39 @@
+import threading
+
+from sqlalchemy import select
+
+from app.database.connection import db_manager
+from app.services.profiling import SamplingProfiler
+
+def test_message_limit_counts_every_thread_and_stops_once():
+    profiler = SamplingProfiler()
+    assert profiler.start([], messages=4000, interval=1)
+
+    threads = [threading.Thread(target=lambda: [profiler.message_processed() for _ in range(1000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not profiler.active
+    assert profiler.session.messages_seen == 4000
+
+def test_query_start_left_by_a_stopped_session_is_not_reused():
+    profiler = SamplingProfiler()
+    engine = db_manager.ingest_engine
+
+    with engine.connect() as connection:
+        # The first session stops while a query is in flight: its start time stays on the connection
+        assert profiler.start([engine], interval=1)
+        profiler._before_cursor_execute(connection, None, "SELECT 1", None, None, False)
+        profiler.stop()
+
+        assert profiler.start([engine], interval=1)
+        profiler._after_cursor_execute(connection, None, "SELECT 1", None, None, False)
+        assert not profiler.session.sql
+
+        connection.execute(select(1))
+        session = profiler.stop()
+
+    assert [stats["count"] for stats in session.sql.values()] == [1]
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, inspect, select, text
+
+from app.database.connection import db_manager
+from app.models.analytics import DailyAnalytics, DomainAnalytics, HourlyAnalytics, UserRegistrationEvent
+from app.models.events import decode_registration
+from app.services.analytics_service import AnalyticsService
+from app.services.rebuild_service import AggregateRebuilder, _lock_timeout_ms
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def _events(first_user_id: int, count: int):
+    # Spread over three days and a handful of domains
+    return [
+        decode_registration({
+            "user_id": user_id,
+            "name": "User",
+            "email": f"user{user_id}@domain{user_id % 4}.example",
+            "created_at": (START + timedelta(minutes=37 * user_id)).isoformat(),
+        })
+        for user_id in range(first_user_id, first_user_id + count)
+    ]
+
+def _raw_counts(db):
+    hour = func.strftime("%Y-%m-%d %H", UserRegistrationEvent.registration_time)
+    return {
+        "hours": dict(db.execute(select(hour, func.count()).group_by(hour)).all()),
+        "domains": dict(db.execute(
+            select(UserRegistrationEvent.email_domain, func.count()).group_by(UserRegistrationEvent.email_domain)
+        ).all()),
+        "total": db.execute(select(func.count()).select_from(UserRegistrationEvent)).scalar(),
+    }
+
+def _aggregate_counts(db):
+    hour = func.strftime("%Y-%m-%d %H", HourlyAnalytics.hour_start)
+    return {
+        "hours": dict(db.execute(select(hour, HourlyAnalytics.registrations_count)).all()),
+        "domains": dict(db.execute(select(DomainAnalytics.domain, DomainAnalytics.total_registrations)).all()),
+        "total": db.execute(select(func.sum(DailyAnalytics.total_registrations))).scalar(),
+    }
+
+def test_rebuild_repairs_drift_and_keeps_events_committed_during_the_run(db, monkeypatch):
+    assert AnalyticsService(db).process_registration_batch(_events(1, 150))
+
+    # Double counting after a requeue, and a lost domain row
+    db.execute(text("UPDATE hourly_analytics SET registrations_count = registrations_count + 2 WHERE id % 3 = 0"))
+    days = db.execute(select(func.count()).select_from(DailyAnalytics)).scalar()
+    db.execute(text("UPDATE daily_analytics SET total_registrations = total_registrations + 7"))
+    db.execute(text("DELETE FROM domain_analytics WHERE domain = 'domain1.example'"))
+    db.commit()
+    assert _aggregate_counts(db) != _raw_counts(db)
+
+    # Events committed after the id fence must be folded in by the swap
+    rebuilder = AggregateRebuilder()
+    aggregate_parallel = rebuilder._aggregate_parallel
+
+    def ingest_during_aggregation(*args, **kwargs):
+        result = aggregate_parallel(*args, **kwargs)
+        session = db_manager.get_ingest_session()
+        try:
+            assert AnalyticsService(session).process_registration_batch(_events(1000, 20))
+        finally:
+            session.close()
+        return result
+
+    monkeypatch.setattr(rebuilder, "_aggregate_parallel", ingest_during_aggregation)
+
+    session = db_manager.get_ingest_session()
+    try:
+        status = rebuilder.run(session, workers=2, chunk_hours=12)
+    finally:
+        session.close()
+
+    assert status["state"] == "completed", status["error"]
+    assert status["tail_rows"] == 20
+    assert status["rows_scanned"] == 170
+    # Events ingested during the run are in both the live and the rebuilt tables
+    assert status["drift"]["daily"]["count_delta"] == -7 * days
+    assert _aggregate_counts(db) == _raw_counts(db)
+
+def test_dry_run_reports_drift_without_swapping(db):
+    assert AnalyticsService(db).process_registration_batch(_events(1, 40))
+    db.execute(text("UPDATE hourly_analytics SET registrations_count = registrations_count + 1"))
+    db.commit()
+    before = _aggregate_counts(db)
+
+    session = db_manager.get_ingest_session()
+    try:
+        status = AggregateRebuilder().run(session, workers=1, dry_run=True)
+    finally:
+        session.close()
+
+    assert status["state"] == "completed", status["error"]
+    assert status["drift"]["hourly"]["rows_changed"] == len(before["hours"])
+    assert _aggregate_counts(db) == before
+
+def test_swap_keeps_the_live_schema_and_ingest_writes_to_the_rebuilt_tables(db):
+    assert AnalyticsService(db).process_registration_batch(_events(1, 30))
+    db.commit()
+    schema_before = {
+        table: sorted((index["name"], tuple(index["column_names"])) for index in inspect(db.connection()).get_indexes(table))
+        for table in ("domain_analytics", "hourly_analytics", "daily_analytics")
+    }
+    db.commit()
+
+    for _ in range(2):
+        session = db_manager.get_ingest_session()
+        try:
+            status = AggregateRebuilder().run(session, workers=1)
+        finally:
+            session.close()
+        assert status["state"] == "completed", status["error"]
+
+    inspector = inspect(db.connection())
+    assert not [name for name in inspector.get_table_names() if name.endswith(("_rebuild", "_retired"))]
+    assert {
+        table: sorted((index["name"], tuple(index["column_names"])) for index in inspector.get_indexes(table))
+        for table in schema_before
+    } == schema_before
+    db.commit()
+
+    assert AnalyticsService(db).process_registration_batch(_events(500, 10))
+    assert _aggregate_counts(db) == _raw_counts(db)
+
+def test_lock_timeout_must_be_whole_milliseconds(monkeypatch):
+    monkeypatch.setenv("ANALYTICS_REBUILD_LOCK_TIMEOUT_MS", "2500")
+    assert _lock_timeout_ms() == 2500
+
+    for value in ("10s", "0", "1; SET lock_timeout = 0"):
+        monkeypatch.setenv("ANALYTICS_REBUILD_LOCK_TIMEOUT_MS", value)
+        with pytest.raises(ValueError):
+            _lock_timeout_ms()
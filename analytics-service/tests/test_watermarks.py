@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from app.database.connection import db_manager
+from app.models.events import decode_registration
+from app.services.analytics_service import AnalyticsService
+from app.services.watermark_service import WatermarkService, sealed_hour_cache
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def _event(user_id: int, at: datetime):
+    return decode_registration({
+        "user_id": user_id,
+        "name": "User",
+        "email": f"user{user_id}@example.com",
+        "created_at": at.isoformat(),
+    })
+
+def _trends(db):
+    # Far enough back to include START
+    days = (datetime.now(timezone.utc) - START).days + 2
+    return {row["timestamp"][:13]: row for row in AnalyticsService(db).get_hourly_trends(days=days)}
+
+def test_buckets_behind_the_watermark_are_sealed(db):
+    events = [_event(user_id, START + timedelta(minutes=10 * user_id)) for user_id in range(1, 21)]
+    assert AnalyticsService(db).process_registration_batch(events)
+
+    status = WatermarkService(db).get_status()
+    assert status["watermark"] == (START + timedelta(minutes=200) - timedelta(minutes=5)).isoformat()
+    assert status["sealed_through"]["hour"] == (START + timedelta(hours=3)).isoformat()
+
+    trends = _trends(db)
+    assert trends["2025-01-01T00"]["sealed"] is True
+    assert trends["2025-01-01T03"]["sealed"] is False
+
+def test_late_event_reopens_a_cached_hour(db):
+    service = AnalyticsService(db)
+    assert service.process_registration_batch(
+        [_event(user_id, START + timedelta(minutes=10 * user_id)) for user_id in range(1, 21)]
+    )
+    assert _trends(db)["2025-01-01T00"]["registrations"] == 5
+
+    assert service.process_registration_batch([_event(99, START + timedelta(minutes=1))])
+
+    assert _trends(db)["2025-01-01T00"]["registrations"] == 6
+    status = WatermarkService(db).get_status()
+    assert status["late_events"] == 1
+    assert status["reopened_hour_buckets"] == 1
+
+def test_steady_state_batch_writes_watermarks_with_one_statement(db):
+    service = AnalyticsService(db)
+    assert service.process_registration_batch([_event(1, START + timedelta(minutes=10))])
+
+    statements = []
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_manager.ingest_engine, "before_cursor_execute", _count)
+    try:
+        WatermarkService(db).observe_registrations(
+            [_event(2, START + timedelta(minutes=20)), _event(3, START + timedelta(minutes=25))],
+            datetime.now(timezone.utc)
+        )
+    finally:
+        event.remove(db_manager.ingest_engine, "before_cursor_execute", _count)
+    db.commit()
+
+    # No max() over the table and no separate sealing pass within the same hour
+    assert len(statements) == 1 and "ON CONFLICT" in statements[0]
+    assert WatermarkService(db).get_status()["open_buckets"][0]["events"] == 3
+
+class _InvalidatingSession:
+    """Session proxy that lets a late event land while the cache is reading"""
+    def __init__(self, db, hour):
+        self.db = db
+        self.hour = hour
+
+    def execute(self, *args, **kwargs):
+        result = self.db.execute(*args, **kwargs)
+        sealed_hour_cache.invalidate([self.hour])
+        return result
+
+def test_rows_fetched_across_an_invalidation_are_not_cached(db):
+    assert AnalyticsService(db).process_registration_batch(
+        [_event(user_id, START + timedelta(minutes=10 * user_id)) for user_id in range(1, 21)]
+    )
+
+    counts = sealed_hour_cache.read(_InvalidatingSession(db, START), START, START + timedelta(hours=3))
+    assert counts[START] == 5
+
+    # Nothing from the racing read was kept; the next read goes back to the database
+    queries = []
+    class _Recording:
+        def execute(self, *args, **kwargs):
+            queries.append(args)
+            return db.execute(*args, **kwargs)
+
+    sealed_hour_cache.read(_Recording(), START, START + timedelta(hours=3))
+    assert len(queries) == 1
+    sealed_hour_cache.read(_Recording(), START, START + timedelta(hours=3))
+    assert len(queries) == 1